@@ -0,0 +1,88 @@
+import json
+import time
+from pathlib import Path
+
+import pygame as pg
+
+
+def surface_bytes(surf: pg.Surface) -> int:
+    return surf.get_pitch() * surf.get_height()
+
+
+class AssetManager:
+    """Loads every image once and caches converted and scaled variants
+
+    Images are read from disk once (preload() reads the whole folder),
+    converted to the display format on first use and kept per
+    (name, alpha, colorkey, size). Sprite sheets are sliced into named
+    sprites by a json manifest next to them:
+
+        {"sprites": {"name": [x, y, w, h], ...}}
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.raw = {}  # name -> surface as loaded from disk
+        self.images = {}  # (name, alpha, colorkey, size) -> converted surface
+        self.atlases = {}  # (image, manifest, alpha) -> {sprite name: subsurface}
+        self.load_time = 0.0  # seconds spent reading and converting images
+
+    def preload(self, pattern="*.png"):
+        for file in sorted(self.path.glob(pattern)):
+            self.load(file.name)
+
+    def load(self, name) -> pg.Surface:
+        """the image as loaded from disk, read only once"""
+        if name not in self.raw:
+            t = time.perf_counter()
+            self.raw[name] = pg.image.load(self.path / name)
+            self.load_time += time.perf_counter() - t
+        return self.raw[name]
+
+    def load_atlas(self, image, manifest, alpha=True) -> dict:
+        """named sprites of the sheet image, as listed in manifest, cached
+
+        the sprites are subsurfaces of the cached converted sheet, no copies
+        """
+        key = (image, manifest, alpha)
+        if key not in self.atlases:
+            with open(self.path / manifest, encoding="utf-8") as f:
+                rects = json.load(f)["sprites"]
+            sheet = self.image(image, alpha=alpha)
+            self.atlases[key] = {name: sheet.subsurface(rect) for name, rect in rects.items()}
+        return self.atlases[key]
+
+    def image(self, name, size=None, alpha=True, colorkey=None) -> pg.Surface:
+        """converted (and optionally scaled) image, cached
+
+        alpha=True keeps per-pixel alpha (convert_alpha), otherwise the image
+        is converted to the display format and colorkey is applied.
+        """
+        key = (name, alpha, colorkey, tuple(size) if size else None)
+        if key in self.images:
+            return self.images[key]
+
+        t = time.perf_counter()
+        if size is not None:
+            surf = pg.transform.scale(self.image(name, None, alpha, colorkey), size)
+        else:
+            source = self.load(name)
+            surf = source.convert_alpha() if alpha else source.convert()
+            if colorkey is not None:
+                surf.set_colorkey(colorkey)
+        self.images[key] = surf
+        self.load_time += time.perf_counter() - t
+        return surf
+
+    @property
+    def memory(self) -> int:
+        """bytes held by loaded and converted surfaces"""
+        return sum(map(surface_bytes, self.raw.values())) + sum(
+            map(surface_bytes, self.images.values())
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Assets({len(self.raw)} files, {len(self.images)} variants, "
+            f"{self.memory / 1024:.0f} kB, {self.load_time * 1000:.1f} ms)"
+        )
@@ -0,0 +1,103 @@
+"""Import-time and startup-time benchmark for the model package
+
+Every measurement runs in a fresh interpreter, so module and dataset caches
+of one measurement don't leak into the next one.
+
+    python benchmarks/startup.py [--repeat 5]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).parent.parent
+
+SNIPPETS = {
+    "import model.Simulation": """
+t = perf_counter()
+import model.Simulation
+result = perf_counter() - t
+""",
+    "import model.GameModel": """
+t = perf_counter()
+import model.GameModel
+result = perf_counter() - t
+""",
+    "EnergyModel() first": """
+from model.Simulation import EnergyModel
+t = perf_counter()
+EnergyModel()
+result = perf_counter() - t
+""",
+    "EnergyModel() second": """
+from model.Simulation import EnergyModel
+EnergyModel()
+t = perf_counter()
+EnergyModel()
+result = perf_counter() - t
+""",
+    "init_sim() first": """
+from model.Simulation import EnergyModel
+m = EnergyModel()
+t = perf_counter()
+m.init_sim()
+result = perf_counter() - t
+""",
+    "init_sim() second": """
+from model.Simulation import EnergyModel
+m = EnergyModel()
+m.init_sim()
+t = perf_counter()
+m.init_sim()
+result = perf_counter() - t
+""",
+    "GameModel() + setup_sim()": """
+t = perf_counter()
+from model.GameModel import GameModel
+g = GameModel()
+g.setup_sim()
+result = perf_counter() - t
+""",
+}
+
+PRELUDE = f"""
+import sys
+from time import perf_counter
+sys.path.insert(0, {str(ROOT_PATH)!r})
+"""
+
+EPILOGUE = """
+print(result, "matplotlib" in sys.modules, "argparse" in sys.modules)
+"""
+
+
+def measure(snippet):
+    out = subprocess.run(
+        [sys.executable, "-c", PRELUDE + snippet + EPILOGUE],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()[-1]
+    seconds, mpl, argp = out.split()
+    return float(seconds), mpl == "True", argp == "True"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"{'measurement':<28} {'median':>9} {'min':>9}  matplotlib  argparse")
+    for label, snippet in SNIPPETS.items():
+        runs = [measure(snippet) for _ in range(args.repeat)]
+        times = [r[0] for r in runs]
+        _, mpl, argp = runs[-1]
+        print(
+            f"{label:<28} {statistics.median(times)*1000:>7.1f}ms {min(times)*1000:>7.1f}ms"
+            f"  {'loaded' if mpl else '-':<10}  {'loaded' if argp else '-'}"
+        )
@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """A bounded least-recently-used cache that counts its hits and misses"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """returns the cached value for key, calls build() to create it on a miss"""
+        try:
+            value = self.items[key]
+        except KeyError:
+            self.misses += 1
+            value = self.items[key] = build()
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+            return value
+        self.hits += 1
+        self.items.move_to_end(key)
+        return value
+
+    def discard(self, key):
+        self.items.pop(key, None)
+
+    def clear(self):
+        self.items.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        return f"{len(self)}/{self.maxsize} hits {self.hits} misses {self.misses} ({self.hit_rate:.0%})"
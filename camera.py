@@ -1,4 +1,5 @@
 from typing import Protocol
+import numpy as np
 import pygame as pg
 
 
@@ -28,6 +29,7 @@ class Camera2D(Camera):
         self.zoom_level = zoom
         self.follows = None
         self.relative_speed = pg.Vector2(0, 0)
+        self._transform_state = None
 
     def follow(self, Node, maxdist=1):
         self.maxdist = maxdist
@@ -43,14 +45,21 @@ class Camera2D(Camera):
                 self.position.move_towards_ip(self.follows.position, gap)
 
     @property
-    def view_rect(self):
-        rect = pg.Rect(
-            self.position.x - self.screen_width / 2 / self.zoom_level[0],
-            self.position.y - self.screen_height / 2 / self.zoom_level[1],
-            self.position.x + self.screen_width / 2 / self.zoom_level[0],
-            self.position.y + self.screen_height / 2 / self.zoom_level[1],
+    def view_bounds(self) -> tuple[float, float, float, float]:
+        """(xmin, xmax, ymin, ymax) of the camera view in game coordinates"""
+        half_width = self.screen_width / 2 / self.zoom_level[0]
+        half_height = self.screen_height / 2 / self.zoom_level[1]
+        return (
+            self.position.x - half_width,
+            self.position.x + half_width,
+            self.position.y - half_height,
+            self.position.y + half_height,
         )
-        return rect
+
+    @property
+    def view_rect(self):
+        xmin, xmax, ymin, ymax = self.view_bounds
+        return pg.Rect(xmin, ymin, xmax - xmin, ymax - ymin)
 
     def project(self, sprite: pg.sprite.Sprite):
         image = pg.transform.scale_by(sprite.image, self.zoom_level)
@@ -77,6 +86,39 @@ class Camera2D(Camera):
         v_proj = pg.Vector2(projector_x, projector_y)
         return v_proj
 
+    @property
+    def transform(self) -> tuple[np.ndarray, np.ndarray]:
+        """affine (scale, offset) with screen = game * scale + offset
+
+        recomputed only when the zoom or pan state changed since the last call
+        """
+        state = (self.position.x, self.position.y, *self.zoom_level)
+        if state != self._transform_state:
+            scale = np.array((self.zoom_level[0], -self.zoom_level[1]), dtype=float)
+            offset = np.array(self.proj_center, dtype=float) - np.array(state[:2]) * scale
+            self._transform_state = state
+            self._transform = scale, offset
+        return self._transform
+
+    def screen_coords_array(self, xy: np.ndarray) -> np.ndarray:
+        """screen_coords for an (n, 2) array of game coordinates"""
+        scale, offset = self.transform
+        return xy * scale + offset
+
+    def project_xy(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """projects separate x and y arrays to an (n, 2) array of screen coordinates"""
+        scale, offset = self.transform
+        screen = np.empty((len(xs), 2))
+        np.multiply(xs, scale[0], out=screen[:, 0])
+        np.multiply(ys, scale[1], out=screen[:, 1])
+        screen += offset
+        return screen
+
+    def game_coords_array(self, screen_xy: np.ndarray) -> np.ndarray:
+        """inverse of screen_coords_array, e.g. for picking"""
+        scale, offset = self.transform
+        return (np.asarray(screen_xy, dtype=float) - offset) / scale
+
     def game_coords(self, screen_coords: pg.Vector2) -> pg.Vector2:
         game_x = (screen_coords.x - self.proj_center.x) / self.zoom_level[0]
         game_y = -(screen_coords.y - self.proj_center.y) / self.zoom_level[1]
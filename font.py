@@ -1,13 +1,48 @@
-from collections import defaultdict
+import hashlib
+import json
+from pathlib import Path
 import pygame, sys
 
+from assets import AssetManager
+
 # Funcs/Classes ---------------------------------------------- #
-def clip(surf,x,y,x_size,y_size):
-    handle_surf = surf.copy()
-    clipR = pygame.Rect(x,y,x_size,y_size)
-    handle_surf.set_clip(clipR)
-    image = surf.subsurface(handle_surf.get_clip())
-    return image.copy()
+def scan_glyphs(font_img):
+    """[(x, width), ...] of the glyphs, separated by marker pixels (red 127) in the top row"""
+    metrics = []
+    current_char_width = 0
+    for x in range(font_img.get_width()):
+        c = font_img.get_at((x, 0))
+        if c[0] == 127:
+            metrics.append((x - current_char_width, current_char_width))
+            current_char_width = 0
+        else:
+            current_char_width += 1
+    return metrics
+
+def glyph_manifest(path, font_img, characters):
+    """atlas manifest (see AssetManager.load_atlas) of the glyphs of a font image
+
+    written to a .glyphs.json file next to it, keyed by the hash of the image
+    file, so an edited font is rescanned. Returns the manifest file name.
+    """
+    path = Path(path)
+    cache = path.with_suffix(".glyphs.json")
+    digest = hashlib.sha1(path.read_bytes()).hexdigest()
+    try:
+        with open(cache, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["sha1"] == digest and "sprites" in cached:
+            return cache.name
+    except (OSError, ValueError, KeyError):
+        pass
+    height = font_img.get_height()
+    sprites = {
+        char: [x, 0, width, height]
+        for char, (x, width) in zip(characters, scan_glyphs(font_img))
+    }
+    with open(cache, "w", encoding="utf-8") as f:
+        json.dump({"sha1": digest, "sprites": sprites}, f, ensure_ascii=False)
+    return cache.name
 
 class Font():
     def __init__(self, path):
@@ -20,21 +55,15 @@ class Font():
                                 '0','1','2','3','4','5','6','7','8','9','(',')',
                                 '/','_','=','\\','[',']','*','"','<','>',';','°',
                                 '#','²','³','|','??','%', '€']
-        font_img = pygame.image.load(path).convert()
+        path = Path(path)
+        assets = AssetManager(path.parent)
+        font_img = assets.load(path.name)
         self.height = font_img.get_height()
-        current_char_width = 0
-        self.characters = {}
         self.missing_char_replacement = "??"
-        character_count = 0
-        for x in range(font_img.get_width()):
-            c = font_img.get_at((x, 0))
-            if c[0] == 127:
-                char_img = clip(font_img, x - current_char_width, 0, current_char_width, self.height)
-                self.characters[self.character_order[character_count]] = char_img.copy()
-                character_count += 1
-                current_char_width = 0
-            else:
-                current_char_width += 1
+        # glyphs are subsurfaces of the one font image, no copies
+        manifest = glyph_manifest(path, font_img, self.character_order)
+        self.characters = assets.load_atlas(path.name, manifest, alpha=False)
+        self.atlas = assets.image(path.name, alpha=False)
         self.space_width = self.characters['A'].get_width()
 
     def character(self, char):
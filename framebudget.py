@@ -0,0 +1,111 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# quality steps, from full detail down; each step is applied on top of the renderer
+QUALITY_LEVELS = [
+    {"particle_fraction": 1.0, "lod_bias": 0, "outlines": True},
+    {"particle_fraction": 0.5, "lod_bias": 0, "outlines": True},
+    {"particle_fraction": 0.5, "lod_bias": 1, "outlines": True},
+    {"particle_fraction": 0.25, "lod_bias": 2, "outlines": True},
+    {"particle_fraction": 0.25, "lod_bias": 2, "outlines": False},
+]
+
+
+class FrameBudget:
+    """Measures frame phases into rolling windows and adapts render quality to a budget
+
+    Wrap the phases of a frame in measure("update") / measure("render") and
+    call end_frame() once per frame. When the p95 frame time of the recent
+    window exceeds the budget, quality drops one level, when it stays well
+    below the budget it goes back up one level.
+    """
+
+    def __init__(self, fps=60, window=240, cooldown=60, headroom=0.7):
+        self.budget = 1 / fps  # seconds per frame
+        self.window = window  # frames kept for the percentiles
+        self.cooldown = cooldown  # frames between two quality changes
+        self.headroom = headroom  # go up again below headroom * budget
+        self.times = {"frame": deque(maxlen=window)}
+        self.current = {}
+        self.level = 0
+        self.frames_since_change = 0
+        self.frames = 0
+        self.quality_changes = 0
+
+    @contextmanager
+    def measure(self, phase):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[phase] = self.current.get(phase, 0.0) + time.perf_counter() - t
+
+    def end_frame(self):
+        """stores the measured phases of this frame and adapts the quality level"""
+        for phase, seconds in self.current.items():
+            self.times.setdefault(phase, deque(maxlen=self.window)).append(seconds)
+        self.times["frame"].append(sum(self.current.values()))
+        self.current = {}
+        self.frames += 1
+        self.frames_since_change += 1
+        self.adapt()
+
+    def adapt(self):
+        if self.frames_since_change < self.cooldown:
+            return
+        p95 = self.percentiles("frame")[1]
+        if p95 > self.budget and self.level < len(QUALITY_LEVELS) - 1:
+            self.set_level(self.level + 1)
+        elif p95 < self.headroom * self.budget and self.level > 0:
+            self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        self.level = level
+        self.frames_since_change = 0
+        self.quality_changes += 1
+
+    @property
+    def quality(self) -> dict:
+        return QUALITY_LEVELS[self.level]
+
+    def apply(self, renderer):
+        """sets the quality of the current level on the renderer"""
+        for setting, value in self.quality.items():
+            setattr(renderer, setting, value)
+
+    def reset(self, renderer):
+        """back to full quality on the renderer, e.g. when leaving the budgeted scene"""
+        if self.level:
+            self.set_level(0)
+        self.apply(renderer)
+
+    def percentiles(self, phase, q=(50, 95, 99)):
+        """(p50, p95, p99) in seconds over the rolling window"""
+        samples = self.times.get(phase)
+        if not samples:
+            return tuple(0.0 for _ in q)
+        return tuple(np.percentile(samples, q))
+
+    def summary(self, phase):
+        p50, p95, p99 = (1000 * p for p in self.percentiles(phase))
+        return f"p50 {p50:.1f} p95 {p95:.1f} p99 {p99:.1f} ms"
+
+    def histogram(self, phase="frame", bins=10):
+        """(counts, bin edges in ms) of the rolling window"""
+        return np.histogram(np.array(self.times.get(phase, ())) * 1000, bins=bins)
+
+    def dump(self):
+        """text report of the rolling windows, e.g. for printing on exit"""
+        lines = [
+            f"Frame budget {self.budget * 1000:.1f} ms, {self.frames} frames, "
+            f"quality level {self.level} ({self.quality_changes} changes)"
+        ]
+        for phase in self.times:
+            lines.append(f"  {phase:<8} {self.summary(phase)}")
+        counts, edges = self.histogram()
+        for count, low, high in zip(counts, edges, edges[1:]):
+            lines.append(f"  {low:6.1f}-{high:6.1f} ms {'#' * int(50 * count / max(counts.max(), 1))} {count}")
+        return "\n".join(lines)
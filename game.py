@@ -1,11 +1,17 @@
 # Import required modules and classes
 
+import sys
+
 import pygame as pg
 from camera import Camera2D
 from model.GameModel import GameModel
 from handler import Button, InputHandler
 from renderer import Renderer
 from particles import ParticleManager
+from scheduler import SimulationScheduler
+from framebudget import FrameBudget
+from scenes import Scene, SceneManager
+from jobs import JobSystem
 
 pg.init()
 print(pg.version)
@@ -19,132 +25,197 @@ clock = pg.time.Clock()
 
 def quit_game():
     print("Quitting game...")
+    print(frame_budget.dump())
+    print("Menu", menu_budget.dump())
+    jobs.shutdown()
     pg.quit()
     quit()
 
 
-def main_loop(
-    screen,
-    game: GameModel,
-    renderer: Renderer,
-    input_handler: InputHandler,
-    clock: pg.time.Clock,
-    particle_manager: ParticleManager,
-):
-    """The main game loop responsible for processing events, updating game state, and rendering."""
-    running = True
-    accumulated_gamehours = 0
-    while running:
-        running = input_handler.update()
-
-        dt_real = clock.tick(60) / 1000.0  # Convert milliseconds to seconds
-        accumulated_gamehours += dt_real * game.speed * (not game.paused)  # h/s
-        print(game.hour, accumulated_gamehours)
-
-        if game.hour + accumulated_gamehours >= game.final_hour_of_the_year - 1:
-            level_finished()
-
-        if game.paused:
-            continue
+def present(screen, display, dirty_rects):
+    """copies only the dirty parts of the off-screen display to the screen"""
+    for rect in dirty_rects:
+        screen.blit(display, rect, rect)
+    pg.display.update(dirty_rects)
 
-        if accumulated_gamehours >= 1:
-            hours = int(accumulated_gamehours)
-            accumulated_gamehours -= hours
-            game.update(hours=hours)
-
-        if game.money <= 0:
-            out_of_money()
-
-        particle_manager.update()
-        # render
-        renderer.camera.update()
-        renderer.draw_background(game.hour)
-
-        renderer.draw_heat_particles(particle_manager.groups["heating"])
-        renderer.draw_cool_particles(particle_manager.groups["cooling"])
-        renderer.render_curves(game.get_curves_data())
-        renderer.render_ui(game.get_ui_data())
-
-        for button in input_handler.buttons:
-            renderer.render_button(button)
-
-        fps = clock.get_fps()
-        renderer.debug(
-            {
-                "FPS": lambda: f"{fps:2.1f}",
-                "Acc. hours": lambda: f"{accumulated_gamehours:.2f} h",
-                "State": game.__repr__,
-                "Speed": lambda: f"{game.speed:.0f} h/s",
-            }
-        )
 
-        screen.blit(renderer.display, (0, 0))
-        pg.display.update()
+class YearScene(Scene):
+    """The year being played, responsible for processing events and rendering.
 
-        game.cleanup()
+    The simulation runs on the scheduler's worker thread, this scene only
+    renders its published snapshots, so the frame rate doesn't depend on game speed.
+    """
 
-        if game.finished:
-            running = False
+    def __init__(
+        self,
+        input_handler: InputHandler,
+        game: GameModel,
+        renderer: Renderer,
+        particle_manager: ParticleManager,
+    ):
+        super().__init__(input_handler)
+        self.game = game
+        self.renderer = renderer
+        self.particle_manager = particle_manager
 
+    def enter(self):
+        self.game.setup_sim()
+        scheduler.start()
+        self.renderer.camera.follow(scheduler, maxdist=0)
 
-def menu_loop(screen, renderer: Renderer, menu_handler: InputHandler, clock):
-    running = True
-    while running:
-        running = menu_handler.update()
+    def exit(self):
+        scheduler.stop()
+        self.particle_manager.clear()
+        # the renderer is shared with the other scenes, which have no quality levels
+        frame_budget.reset(self.renderer)
 
-        renderer.render_menu(game.get_menu_data())
+    def frame(self):
+        game, renderer = self.game, self.renderer
+        scheduler.commit_input()
 
-        for button in menu_handler.buttons:
-            renderer.render_button(button)
+        if scheduler.year_finished:
+            scenes.switch(year_end_scene)
+            return
 
-        screen.blit(renderer.display, (0, 0))
-        pg.display.update()
-        clock.tick(60)
+        if game.paused:
+            return
 
+        if scheduler.out_of_money:
+            scenes.switch(out_of_money_scene)
+            return
 
+        snapshot = scheduler.snapshot
 
-def end_of_year_screen(screen, renderer: Renderer, game: GameModel):
-    """Displays end-of-level summary before returning to menu."""
-    end_running = True
-    lines = [f"{label}: {value}" for label, value in game.get_kpis().items()]
-    while end_running:
-        popup_handler.update()
-        renderer.render_popup("You survived the year!", lines)
-        for button in popup_handler.buttons:
-            renderer.render_button(button)
-        screen.blit(renderer.display, (0, 0))
-        pg.display.update()
+        with frame_budget.measure("update"):
+            self.particle_manager.update()
+            renderer.camera.update()
 
-def out_of_money_screen(screen, renderer: Renderer, game: GameModel):
-    end_running = True
-    lines = [f"{label}: {value}" for label, value in game.get_kpis().items()]
-    game.setup_new_game()
-    while end_running:
-        popup_handler.update()
-        renderer.render_popup("Du hast kein Geld mehr!", lines)
-        for button in popup_handler.buttons:
-            renderer.render_button(button)
+        # render
+        with frame_budget.measure("render"):
+            renderer.draw_background(snapshot.hour)
+
+            renderer.draw_heat_particles(self.particle_manager.groups["heating"])
+            renderer.draw_cool_particles(self.particle_manager.groups["cooling"])
+            renderer.render_curves(scheduler.curves_data())
+            renderer.render_ui(snapshot.ui)
+
+            for button in self.input_handler.buttons:
+                renderer.render_button(button)
+
+            fps = clock.get_fps()
+            renderer.debug(
+                {
+                    "FPS": lambda: f"{fps:2.1f}",
+                    "Frame": lambda: frame_budget.summary("frame"),
+                    "Quality": lambda: f"level {frame_budget.level}",
+                    "Sim. lag": lambda: f"{scheduler.lag:.2f} h",
+                    "Hour": lambda: f"{snapshot.hour}   Ti= {snapshot.TI:.2f}°C",
+                    "Speed": lambda: f"{game.speed:.0f} h/s",
+                    "Autopilot": lambda: repr(game.autopilot),
+                    "Text cache": renderer.text_cache.__repr__,
+                    "Assets": renderer.assets.__repr__,
+                }
+            )
+
+            screen.blit(renderer.display, (0, 0))
+            pg.display.update()
+
+        frame_budget.end_frame()
+        frame_budget.apply(renderer)
 
-        screen.blit(renderer.display, (0, 0))
-        pg.display.update()
+        if game.finished:
+            scenes.switch(menu_scene)
+
+
+class MenuScene(Scene):
+    def __init__(self, input_handler: InputHandler, game: GameModel, renderer: Renderer):
+        super().__init__(input_handler)
+        self.game = game
+        self.renderer = renderer
+
+    def enter(self):
+        # another scene drew onto the display, recompose the whole menu once
+        self.renderer.invalidate_screens()
+        # upgrade outcomes are simulated on the job system while the menu is open
+        self.game.preview_upgrades()
+
+    def exit(self):
+        self.game.upgrade_outcomes.cancel()
+
+    def frame(self):
+        # measured, the upgrade previews run on threads that share the GIL
+        with menu_budget.measure("render"):
+            dirty = self.renderer.render_screen(
+                "menu",
+                self.renderer.render_menu,
+                self.game.get_menu_data(),
+                self.input_handler.buttons,
+            )
+            present(screen, self.renderer.display, dirty)
+        menu_budget.end_frame()
+
+
+class PopupScene(Scene):
+    """Summary of the year's KPIs, shown before returning to the menu"""
+
+    def __init__(
+        self,
+        input_handler: InputHandler,
+        game: GameModel,
+        renderer: Renderer,
+        title: str,
+        new_game=False,
+    ):
+        super().__init__(input_handler)
+        self.game = game
+        self.renderer = renderer
+        self.title = title
+        self.new_game = new_game  # start over with the initial money and upgrades
+        self.lines = []
+
+    def enter(self):
+        self.lines = [f"{label}: {value}" for label, value in self.game.get_kpis().items()]
+        if self.new_game:
+            self.game.setup_new_game()
+        self.renderer.invalidate_screens()
+
+    def exit(self):
+        self.lines = []
+
+    def frame(self):
+        dirty = self.renderer.render_screen(
+            "popup",
+            lambda data: self.renderer.render_popup(*data),
+            (self.title, self.lines),
+            self.input_handler.buttons,
+        )
+        present(screen, self.renderer.display, dirty)
 
 
-game = GameModel()
+# background workers for model work that would block the menu, the shorter
+# switch interval hands the GIL back to the render thread sooner
+sys.setswitchinterval(0.001)
+jobs = JobSystem(workers=2)
+game = GameModel(jobs=jobs)
+scheduler = SimulationScheduler(game)
 
 particle_manager = ParticleManager()
+# frame times of the main loop, lowers render quality when frames run over budget
+frame_budget = FrameBudget(fps=60)
+menu_budget = FrameBudget(fps=60)  # only measured, the menu has no quality levels
 
 
 def heat():
-    game.heat()
+    scheduler.heat()
     particle_manager.heat(
-        game.position, (0, -game.qh)
+        scheduler.position, (0, -scheduler.snapshot.qh)
     )
 
 
 def cool():
-    game.cool()
+    scheduler.cool()
     particle_manager.cool(
-        game.position, (0, -game.qc)
+        scheduler.position, (0, -scheduler.snapshot.qc)
     )
 
 
@@ -158,33 +229,24 @@ menu_handler = InputHandler()
 game_input_handler = InputHandler()
 popup_handler = InputHandler()
 
-enter_menu = lambda: menu_loop(
-    screen, renderer=renderer, menu_handler=menu_handler, clock=clock
+scenes = SceneManager(clock, fps=60, jobs=jobs)
+menu_scene = MenuScene(menu_handler, game, renderer)
+year_scene = YearScene(game_input_handler, game, renderer, particle_manager)
+year_end_scene = PopupScene(popup_handler, game, renderer, "You survived the year!")
+out_of_money_scene = PopupScene(
+    popup_handler, game, renderer, "Du hast kein Geld mehr!", new_game=True
 )
-def start_year():
-    game.setup_sim()
-    main_loop(
-        screen=screen,
-        game=game,
-        renderer=renderer,
-        input_handler=game_input_handler,
-        clock=clock,
-        particle_manager=particle_manager,
-)
-level_finished = lambda: end_of_year_screen(
-    screen, renderer=renderer, game=game)
-
-out_of_money = lambda: out_of_money_screen(
-    screen, renderer=renderer, game=game)
 
+enter_menu = lambda: scenes.switch(menu_scene)
+start_year = lambda: scenes.switch(year_scene)
 
 
 menu_handler.bind_keypress(pg.K_RETURN, start_year)
 # menu_handler.bind_mousebutton(1, startgame)
-menu_handler.bind_keypress(pg.K_q, quit)
-menu_handler.bind_keypress(pg.K_ESCAPE, quit_game)
+menu_handler.bind_keypress(pg.K_q, scenes.quit)
+menu_handler.bind_keypress(pg.K_ESCAPE, scenes.quit)
 start_button = Button((600, 480), start_year, "Start the Game!")
-quit_button = Button((600, 530), quit_game, "Quit")
+quit_button = Button((600, 530), scenes.quit, "Quit")
 menu_handler.register_button(start_button)
 menu_handler.register_button(quit_button)
 
@@ -193,16 +255,20 @@ game_input_handler.bind_continuous_keypress(pg.K_UP, heat)
 game_input_handler.bind_continuous_keypress(pg.K_DOWN, cool)
 game_input_handler.bind_continuous_mousebutton(0, heat)
 game_input_handler.bind_continuous_mousebutton(2, cool)
-game_input_handler.bind_keypress(pg.K_p, game.toggle_pause)
-game_input_handler.bind_keypress(pg.K_1, lambda: game.set_speed(12))
-game_input_handler.bind_keypress(pg.K_2, lambda: game.set_speed(24))
-game_input_handler.bind_keypress(pg.K_3, lambda: game.set_speed(24 * 7))
-game_input_handler.bind_keypress(pg.K_4, lambda: game.set_speed(24 * 7 * 2))
-game_input_handler.bind_keypress(pg.K_5, lambda: game.set_speed(24 * 7 * 4))
-game_input_handler.bind_keypress(pg.K_w, lambda: game.increment_cop(0.5))
-game_input_handler.bind_keypress(pg.K_s, lambda: game.increment_cop(-0.5))
-game_input_handler.bind_keypress(pg.K_q, quit_game)
+game_input_handler.bind_keypress(pg.K_p, scheduler.toggle_pause)
+game_input_handler.bind_keypress(pg.K_a, scheduler.toggle_autopilot)
+game_input_handler.bind_keypress(pg.K_1, lambda: scheduler.set_speed(12))
+game_input_handler.bind_keypress(pg.K_2, lambda: scheduler.set_speed(24))
+game_input_handler.bind_keypress(pg.K_3, lambda: scheduler.set_speed(24 * 7))
+game_input_handler.bind_keypress(pg.K_4, lambda: scheduler.set_speed(24 * 7 * 2))
+game_input_handler.bind_keypress(pg.K_5, lambda: scheduler.set_speed(24 * 7 * 4))
+game_input_handler.bind_keypress(pg.K_n, scheduler.skip_to_next_day)
+game_input_handler.bind_keypress(pg.K_w, lambda: scheduler.increment_cop(0.5))
+game_input_handler.bind_keypress(pg.K_s, lambda: scheduler.increment_cop(-0.5))
+game_input_handler.bind_keypress(pg.K_q, scenes.quit)
 game_input_handler.bind_keypress(pg.K_ESCAPE, enter_menu)
+next_day_button = Button((20, 540), scheduler.skip_to_next_day, "Next day")
+game_input_handler.register_button(next_day_button)
 
 popup_handler.bind_keypress(pg.K_RETURN, enter_menu)
 popup_handler.bind_keypress(pg.K_ESCAPE, enter_menu)
@@ -210,6 +276,5 @@ ok_button = Button((120, 480), enter_menu, "OK")
 popup_handler.register_button(ok_button)
 
 
-
-
-enter_menu()
+scenes.run(menu_scene)
+quit_game()
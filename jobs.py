@@ -0,0 +1,110 @@
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class Job:
+    """Handle of a submitted job: its future, a cancel flag and the progress it reports
+
+    Jobs are called as fn(job, *args), thread jobs can check job.cancelled
+    and set job.progress (0..1) while they run. Process jobs get None.
+    """
+
+    def __init__(self, name, on_done=None):
+        self.name = name
+        self.on_done = on_done  # on_done(result), called by JobSystem.poll()
+        self.future = None
+        self.progress = 0.0
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """cancels the job if it hasn't started, otherwise asks it to stop"""
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def __repr__(self):
+        state = "done" if self.done else f"{self.progress:.0%}"
+        return f"Job({self.name!r}, {state})"
+
+
+class JobSystem:
+    """Pool of background workers for model work that would block the render thread
+
+    submit() returns a Job right away. The render loop calls poll() once per
+    frame, which runs the on_done callbacks of finished jobs on the render
+    thread, so they can safely update game and renderer state.
+
+    With processes=True the work runs in worker processes instead of threads
+    (no GIL contention), the function and arguments must then be picklable
+    and jobs can only be cancelled before they start.
+    """
+
+    def __init__(self, workers=None, processes=False):
+        self.processes = processes
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = executor(max_workers=workers)
+        self.jobs = []  # submitted, not yet polled
+
+    def submit(self, name, fn, *args, on_done=None, **kwargs) -> Job:
+        job = Job(name, on_done)
+        if self.processes:
+            job.future = self.executor.submit(fn, None, *args, **kwargs)
+        else:
+            job.future = self.executor.submit(self._run, job, fn, *args, **kwargs)
+        self.jobs.append(job)
+        return job
+
+    @staticmethod
+    def _run(job, fn, *args, **kwargs):
+        if job.cancelled:
+            raise CancelledError()
+        result = fn(job, *args, **kwargs)
+        job.progress = 1.0
+        return result
+
+    def poll(self) -> list:
+        """finished jobs since the last poll, after running their callbacks"""
+        finished = [job for job in self.jobs if job.done]
+        if not finished:
+            return finished
+        self.jobs = [job for job in self.jobs if not job.done]
+        for job in finished:
+            if job.future.cancelled() or job.cancelled:
+                continue
+            if job.future.exception() is not None:
+                print(f"Job {job.name} failed: {job.future.exception()!r}")
+                continue
+            if job.on_done is not None:
+                job.on_done(job.future.result())
+        return finished
+
+    @property
+    def pending(self) -> int:
+        return len(self.jobs)
+
+    def cancel(self, name=None):
+        """cancels all jobs, or the ones called name"""
+        for job in self.jobs:
+            if name is None or job.name == name:
+                job.cancel()
+
+    def shutdown(self, wait=True):
+        self.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __repr__(self):
+        kind = "processes" if self.processes else "threads"
+        return f"JobSystem({self.executor._max_workers} {kind}, {self.pending} pending)"
@@ -1,9 +1,72 @@
+import json
 from pathlib import Path
 
 import pandas as pd
 
 DATA_DIR = Path("data")
 
+# parameters of the "params" sheet that Building reads
+PARAMS = (
+    "gross_floor_area",
+    "plot_size",
+    "effective_heat_capacity",
+    "net_storey_height",
+    "differential_cost",
+)
+HULL_COLUMNS = ("Bauteil", "Fläche", "U-Wert", "Temperatur-Korrekturfaktor")
+
+
+def read_workbook(path):
+    """building definition (see read_definition) from the two sheets of an excel workbook"""
+    params = pd.read_excel(path, sheet_name="params")
+    required_columns = {'Unit', 'Value', 'Variable'}
+    if not required_columns.issubset(params.columns):
+        raise ValueError(f"{path} sheet params is missing atleast one column names: {required_columns}")
+    hull = pd.read_excel(path, sheet_name="thermal_hull")
+    return {
+        "params": {
+            row["Variable"]: {"value": float(row["Value"]), "unit": row["Unit"]}
+            for row in params.to_dict("records")
+        },
+        "thermal_hull": [
+            {column: row[column] for column in HULL_COLUMNS}
+            for row in hull.to_dict("records")
+        ],
+    }
+
+
+def read_definition(path):
+    """building definition as a dict, from a .json definition or an excel workbook
+
+        {"params": {"gross_floor_area": {"value": 1440.0, "unit": "m² BGF"}, ...},
+         "thermal_hull": [{"Bauteil": "Dach", "Fläche": 360.0, "U-Wert": 0.1,
+                           "Temperatur-Korrekturfaktor": 1}, ...]}
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            definition = json.load(f)
+    else:
+        definition = read_workbook(path)
+    missing = set(PARAMS) - set(definition["params"])
+    if missing:
+        raise ValueError(f"{path} is missing the params {sorted(missing)}")
+    return definition
+
+
+def convert_workbook(path, target=None):
+    """writes the definition of an excel workbook to a .json next to it (or to target)"""
+    path = Path(path)
+    target = Path(target) if target else path.with_suffix(".json")
+    definition = read_workbook(path)
+    for component in definition["thermal_hull"]:  # numpy scalars -> python numbers
+        for column, value in component.items():
+            if hasattr(value, "item"):
+                component[column] = value.item()
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(definition, f, ensure_ascii=False, indent=1)
+    return target
+
 class Component:
     """
     A representation of a building component of the thermal hull
@@ -24,62 +87,49 @@ class Component:
         return f"{self.name[:10]:<10}: {self.area:>5.0f} m2 @ {self.u_value:>3.2f} W/m²K"
 
 
+def hull_LT(components, bgf):
+    """LT [W/K/m²BGF] of the hull components of a building with gross floor area bgf"""
+    A_B = sum(c.area for c in components)
+    L_B = sum(c.L for c in components)
+    L_PX = max(0, (0.2 * (0.75 - L_B / A_B) * L_B))  # wärmebrücken ZUschlag
+    L_T = L_B + L_PX
+    return L_T / bgf
+
+
 class Building:
     """
     A Model of a building
     """
 
-    def __init__(self, path, u_f=0.9, fensterfl_anteil=0.4):
-        print(f"initializing Building object from {path}")
-        # your code here...
+    def __init__(self, path, u_f=0.9, fensterfl_anteil=0.4, verbose=False, definition=None):
+        """path: .json definition or excel workbook, not read if definition is given"""
+        if verbose:
+            print(f"initializing Building object from {path}")
 
         self.file = path
-        self.df = self.load_params(path)
-
-        self.bgf = self.df.loc["gross_floor_area", "Value"]  # read excel
-        self.gf = self.df.loc["plot_size", "Value"]
-        self.heat_capacity = self.df.loc["effective_heat_capacity", "Value"]
-        self.net_storey_height = self.df.loc["net_storey_height", "Value"]
-        self.differential_cost = self.df.loc["differential_cost", "Value"]
+        if definition is None:
+            definition = read_definition(path)
+        params = {name: p["value"] for name, p in definition["params"].items()}
 
-        self.hull = self.load_hull(path)  # from excel
+        self.bgf = params["gross_floor_area"]
+        self.gf = params["plot_size"]
+        self.heat_capacity = params["effective_heat_capacity"]
+        self.net_storey_height = params["net_storey_height"]
+        self.differential_cost = params["differential_cost"]
 
         self.components = []
         # Außenwand
         # Dach
         # fenster
         # Bodenplatte
-        for i, row in self.hull.iterrows():
+        for row in definition["thermal_hull"]:
             bauteil = Component(row)
             self.components.append(bauteil)
 
-    def load_params(self, path, sheetname="params"):
-        """loads the sheet "params" of a excel at path and returns it as a dataframe"""
-        df = pd.read_excel(path, sheet_name=sheetname)
-        required_columns = {'Unit', 'Value', 'Variable'}
-        common = required_columns.intersection(df.columns)
-        if common != required_columns:
-            raise ValueError(f"{path} sheet params is missing atleast one column names: {required_columns}")
-        df.index = df["Variable"]
-        return df
-
-    def load_hull(self, path):
-        """loads the sheet "thermal_ hull" of a excel at path and returns it as a dataframe"""
-        hull = pd.read_excel(path, sheet_name="thermal_hull")
-        return hull  # returns a dataframe
-
-
-
     @property
     def LT(self):
-        """calculates the LT [W/K/m²BGF] from a Hull Dataframe"""
-        # Todo: switch this to use self.components, as each component.L is available
-        A_B = self.hull["Fläche"].sum()
-        self.hull["L_B"] = self.hull["Fläche"] * self.hull["U-Wert"] * self.hull["Temperatur-Korrekturfaktor"]
-        L_B = self.hull.L_B.sum()
-        L_PX = max(0, (0.2 * (0.75 - L_B / A_B) * L_B))  # wärmebrücken ZUschlag
-        L_T = L_B + L_PX
-        return L_T / self.bgf
+        """calculates the LT [W/K/m²BGF] from the hull components"""
+        return hull_LT(self.components, self.bgf)
 
     def __repr__(self):
         data = 7
@@ -95,6 +145,11 @@ LT:                 {self.LT:>{data}.2f} W/K/m²
 
 
 if __name__ == "__main__":
+    import sys
+
+    # python model/Building.py data/*.xlsx converts workbooks to .json definitions
+    for workbook in sys.argv[1:]:
+        print(f"{workbook} -> {convert_workbook(workbook)}")
 
     #print(Building())
     test = Building(path=Path(DATA_DIR,"building_ph.xlsx"))
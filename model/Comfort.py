@@ -3,12 +3,70 @@
 
 import math
 import random
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 
 
+def mean_reverting_steps(rng, hours, start, center, p_change, alpha, sigma, bounds=None):
+    """random walk that only moves at random change points, pulled towards center
+
+    the change points and the noise are drawn in bulk, only the
+    (cheap) mean reverting update runs per change point
+    """
+    changes = rng.random(hours - 1) < p_change
+    noise = rng.normal(0, sigma, changes.sum())
+
+    levels = np.empty(len(noise) + 1)
+    levels[0] = x = start
+    for i, eps in enumerate(noise.tolist(), start=1):
+        x = x + alpha * (center - x) + eps
+        if bounds is not None:
+            x = max(bounds[0], min(bounds[1], x))
+        levels[i] = x
+
+    # every hour holds the level of the last change point
+    index = np.concatenate(([0], np.cumsum(changes)))
+    return levels[index]
+
+
+@lru_cache(maxsize=32)
+def setpoint_profiles(
+    seed,
+    minimum_room_temperature=20.,
+    hours=8760,
+    p_change=1 / 12,   # average one change per 12 hours
+    alpha_min=0.25,    # pull strength toward center (applied only on change)
+    alpha_max=0.4,     # pull toward center of [dT_min, dT_max]
+    sigma=0.8,         # randomness on change
+    dT_min=1.0,
+    dT_max=5.0,
+):
+    """returns the (minimum, maximum) setpoint arrays for a seed
+
+    results are cached by seed and parameters and returned read-only,
+    so all models built with the same seed share the same arrays
+    """
+    rng = np.random.default_rng(seed)
+    Tmin = mean_reverting_steps(
+        rng, hours, minimum_room_temperature, minimum_room_temperature,
+        p_change, alpha_min, sigma,
+    )
+    dT_center = (dT_min + dT_max) / 2
+    dT = mean_reverting_steps(
+        rng, hours, dT_center, dT_center,
+        p_change, alpha_max, sigma, bounds=(dT_min, dT_max),
+    )
+    Tmax = Tmin + dT
+
+    Tmin.flags.writeable = False
+    Tmax.flags.writeable = False
+    return Tmin, Tmax
+
+
 class Comfortmodel:
-    def __init__(self) -> None:        
+    def __init__(self, seed=None) -> None:
         self.heating_months = [1, 2, 3, 4, 9, 10, 11, 12]  # specify which months should the heating be useed
         self.minimum_room_temperature = 20.
 
@@ -16,67 +74,27 @@ class Comfortmodel:
         self.maximum_room_temperature = 26.
 
         self.timestamp =  pd.Series(np.arange('2021-01-01 00:00', '2022-01-01 00:00', dtype='datetime64[h]'))
+        self.months = self.timestamp.dt.month.to_numpy()
         
         self.comfort = np.ones(8760)*100
 
+        # setpoints are reproducible: pass a seed or read the drawn one from self.seed
+        self.seed = seed if seed is not None else random.randrange(2**32)
         self.TI_minimum_setpoints = self.create_minimum_setpoints()
         self.TI_maximum_setpoints = self.create_maximum_setpoints()
 
         self.comfort_sensitivity = 1
 
-        print(sum(self.TI_minimum_setpoints)/8760)
-
     def update(self, t, TI):
         pass
 
 
     def create_minimum_setpoints(self):
-        mu = self.minimum_room_temperature
-
-        p_change = 1 / 12          # average one change per 12 hours
-        alpha = 0.25               # pull strength toward center (applied only on change)
-        sigma = 0.8                # randomness on change
+        return setpoint_profiles(self.seed, self.minimum_room_temperature)[0]
 
-        points = [mu]
-
-        for _ in range(1, 8760):
-            x = points[-1]
-
-            if random.random() < p_change:
-                # mean-reverting "step"
-                drift = alpha * (mu - x)
-                noise = random.gauss(0, sigma)
-                x = x + drift + noise
-
-            points.append(x)
-
-        return points
-    
     def create_maximum_setpoints(self):
-        p_change = 1 / 12          # average one change per day
-        alpha = 0.4                # pull toward center of [1, 5]
-        sigma = 0.8                # randomness of change
+        return setpoint_profiles(self.seed, self.minimum_room_temperature)[1]
 
-        dT_min = 1.0
-        dT_max = 5.0
-        dT_center = 3.0            # midpoint
-
-        dT = dT_center
-        Tmax = []
-
-        for Tmin in self.TI_minimum_setpoints:
-            if random.random() < p_change:
-                drift = alpha * (dT_center - dT)
-                noise = random.gauss(0, sigma)
-                dT = dT + drift + noise
-
-                # enforce bounds
-                dT = max(dT_min, min(dT_max, dT))
-
-            Tmax.append(Tmin + dT)
-
-        return Tmax
-    
     def comfort_diff(self, TI): #TODO: move to comfortModel
         """Kelvin difference to comfortable temp"""
         dmin = TI - self.minimum_room_temperature
@@ -97,8 +115,28 @@ class Comfortmodel:
             return max(min(score, 100), 0)
 
 
+    def comfort_scores(self, TI):
+        """comfort_score for an array of temperatures
+
+        hours inside the comfort band score 100 in bulk, the others use the
+        scalar formula, so the results match comfort_score to the last bit
+        """
+        TI = np.asarray(TI, dtype=float)
+        scores = np.full(len(TI), 100.)
+        outside = (TI < self.minimum_room_temperature) | (TI > self.maximum_room_temperature)
+        scores[outside] = [self.comfort_score(ti) for ti in TI[outside].tolist()]
+        return scores
+
     def heating_season(self, t):
-        return self.timestamp[t].month in self.heating_months
+        return self.months[t] in self.heating_months
     
     def cooling_season(self, t):
-        return self.timestamp[t].month in self.cooling_months
+        return self.months[t] in self.cooling_months
+
+    def heating_seasons(self, t):
+        """heating_season for a slice or an array of hours"""
+        return np.isin(self.months[t], self.heating_months)
+
+    def cooling_seasons(self, t):
+        """cooling_season for a slice or an array of hours"""
+        return np.isin(self.months[t], self.cooling_months)
@@ -1,12 +1,17 @@
 import sys
 from pathlib import Path
 
+import numpy as np
+
 ROOT_PATH = Path(__file__).parent.parent
 sys.path.append(str(Path(__file__).parent.parent))
 
 DATA_PATH = ROOT_PATH / "data"
 
 from model.Simulation import EnergyModel
+from model.control import Control
+from model.mpc import MPCController
+from model.upgrades import UpgradeOutcomes
 
 UPGRADES = [
     {
@@ -14,50 +19,162 @@ UPGRADES = [
         "cost": 1000,
         "image": "wall.png",
         "available": True,
+        "u_factors": {"Aussenwand": 0.5},  # factors on the U-values of hull components
     },
     {
         "name": "New Windows",
         "cost": 1500,
         "image": "window.png",
         "available": False,
+        "u_factors": {"Fenster": 0.6},
     },
     {
         "name": "HVAC Upgrade",
         "cost": 2000,
         "image": "hvac.png",
         "available": True,
+        "cop_increase": 1,
     },
 ]
 
+
+def comfort_curves(model) -> Control:
+    """the comfort curves of the game as control limits, heating and cooling all year"""
+    comfort, HVAC = model.comfort, model.HVAC
+    hours = len(comfort.TI_minimum_setpoints)
+    return Control(
+        heat_on=comfort.TI_minimum_setpoints,
+        heat_off=comfort.TI_minimum_setpoints,
+        heat_power=np.full(hours, float(HVAC.HP_heating_power)),
+        cool_on=comfort.TI_maximum_setpoints,
+        cool_off=comfort.TI_maximum_setpoints,
+        cool_power=np.full(hours, float(HVAC.HP_cooling_power)),
+    )
+
+
 class Curve:
-    """Manages game time of timeseries in model time"""
+    """Manages game time of timeseries in model time
+
+    The values are kept in a numpy array of one model year, windows in game
+    time are returned as (x, y) arrays without copying unless they wrap the
+    end of the year.
+    """
 
-    def __init__(self, label, points=None, x_list=None, y_list=None):
+    def __init__(self, label, y=None, points=None, x_list=None, y_list=None):
         self.wrap_length = 8760
+        self.origin = 0  # game hour of y[0]
         self.label = label
-        if points is not None:
-            self._mx_list, self.y_list = map(list, zip(*points))
+        if y is not None:
+            self.y = np.array(y, dtype=float)  # own copy, the curve is written to
+        elif points is not None:
+            self.y = np.array([p[1] for p in points], dtype=float)
         elif x_list is not None and y_list is not None:
-            self._mx_list, self.y_list = x_list, y_list
+            self.y = np.array(y_list, dtype=float)
         else:
-            raise ValueError("Either points or x_list and y_list must be provided.")
+            raise ValueError("Either y, points or x_list and y_list must be provided.")
+        self._pyramid = None
+
+    @property
+    def y_list(self):
+        return self.y
 
     def y_slice(self, start, stop):
         if not ((0 <= start < self.wrap_length) and (0 <= stop < self.wrap_length)):
             raise ValueError(f"Both {start=} and {stop=} must be between 0 and 8759")
         return (
-            self.y_list[start:stop]
+            self.y[start:stop]
             if start <= stop
-            else self.y_list[start:] + self.y_list[:stop]
+            else np.concatenate((self.y[start:], self.y[:stop]))
         )
 
+    def window(self, gamex_start, gamex_end):
+        """returns the (x, y) arrays in game time from the appropriate model time
+
+        y is a view into the curve, a window across the year boundary
+        is gathered into one small new array.
+        """
+        n = max(gamex_end - gamex_start, 0)
+        start = (gamex_start - self.origin) % self.wrap_length
+        if start + n <= self.wrap_length:
+            ys = self.y[start : start + n]
+        else:
+            ys = np.concatenate((self.y[start:], self.y[: start + n - self.wrap_length]))
+        return np.arange(gamex_start, gamex_start + n), ys
+
+    @property
+    def pyramid(self):
+        """[(mins, maxs), ...] where level k holds the min/max of blocks of 2**k hours
+
+        rebuilt lazily after the curve was updated
+        """
+        if self._pyramid is None:
+            mins = maxs = self.y
+            levels = [(mins, maxs)]
+            while len(mins) > 1:
+                if len(mins) % 2:
+                    mins, maxs = np.append(mins, mins[-1]), np.append(maxs, maxs[-1])
+                mins = np.minimum(mins[0::2], mins[1::2])
+                maxs = np.maximum(maxs[0::2], maxs[1::2])
+                levels.append((mins, maxs))
+            self._pyramid = levels
+        return self._pyramid
+
+    def lod_window(self, gamex_start, gamex_end, level=0):
+        """window() decimated to a (min, max) vertex pair per block of 2**level hours"""
+        if level <= 0:
+            return self.window(gamex_start, gamex_end)
+        level = min(level, len(self.pyramid) - 1)
+        mins, maxs = self.pyramid[level]
+        block = 2**level
+        xs, ys = [], []
+        gamex = gamex_start
+        while gamex < gamex_end:  # one segment per model year
+            start = (gamex - self.origin) % self.wrap_length
+            stop = min(start + gamex_end - gamex, self.wrap_length)
+            first, last = start // block, (stop - 1) // block + 1
+            centers = gamex - start + (np.arange(first, last) + 0.5) * block
+            xs.append(np.repeat(centers, 2))
+            y = np.empty(2 * (last - first))
+            y[0::2] = mins[first:last]
+            y[1::2] = maxs[first:last]
+            # the first and last block only count their hours inside the window
+            head = self.y[start : min(stop, (first + 1) * block)]
+            tail = self.y[max(start, (last - 1) * block) : stop]
+            y[0], y[1] = head.min(), head.max()
+            y[-2], y[-1] = tail.min(), tail.max()
+            ys.append(y)
+            gamex += stop - start
+        if not xs:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(xs), np.concatenate(ys)
+
+    def span(self, gamex_start, gamex_end, align=64):
+        """copy of the window as a curve of its own, e.g. to hand to the render thread
+
+        it starts at a multiple of align game hours, so its pyramid blocks
+        stay in place while the window moves
+        """
+        gamex_start -= gamex_start % align
+        _, ys = self.window(gamex_start, gamex_end)
+        span = Curve(self.label, ys)
+        span.origin = gamex_start
+        span.wrap_length = max(len(ys), 1)
+        return span
+
     def points_in_game(self, gamex_start, gamex_end):
         """returns the list of points in game time from the appropriate model time"""
-        ys = self.y_slice(gamex_start % self.wrap_length, gamex_end % self.wrap_length)
-        return [(x, y) for x, y in zip(range(gamex_start, gamex_end), ys)]
+        xs, ys = self.window(gamex_start, gamex_end)
+        return list(zip(xs.tolist(), ys.tolist()))
 
     def update_point(self, gamex, y):
-        self.y_list[gamex % self.wrap_length] = y
+        self.y[(gamex - self.origin) % self.wrap_length] = y
+        self._pyramid = None
+
+    def update_range(self, gamex_start, ys):
+        """writes consecutive values from gamex_start on, all within one model year"""
+        start = (gamex_start - self.origin) % self.wrap_length
+        self.y[start : start + len(ys)] = ys
+        self._pyramid = None
 
     def update(self, point_or_points):
         if isinstance(point_or_points, tuple):
@@ -67,6 +184,9 @@ class Curve:
             for gamex, y in point_or_points:
                 self.update_point(gamex, y)
 
+    def __len__(self):
+        return len(self.y)
+
     def __repr__(self) -> str:
         return f"Curve({self.label=})"
 
@@ -82,6 +202,8 @@ class GameModel:
     finished: bool
     heat_on: bool
     cool_on: bool
+    autopilot: MPCController  # plays instead of the player if not None
+    autopilot_speed: int
 
     model: EnergyModel
     hour: int  # ever increasing game hour
@@ -94,7 +216,7 @@ class GameModel:
     curve_comfort_max: Curve
     curve_co2: Curve
 
-    def __init__(self):
+    def __init__(self, jobs=None):
         self.speed = 24  # simulated hours / game second
         self.paused = False
         self.finished = False
@@ -102,6 +224,10 @@ class GameModel:
         self.model.init_sim()
         self.hour = 0
         self._mh = 0
+        self.autopilot = None
+        self.autopilot_speed = 24 * 7  # hours per second the autopilot keeps up with
+        # annual outcomes of the upgrade combinations for the menu, simulated on jobs
+        self.upgrade_outcomes = UpgradeOutcomes(self.model.building.file, jobs=jobs)
         self.setup_new_game()
 
     def setup_new_game(self,
@@ -129,49 +255,65 @@ class GameModel:
 
         self.forecast_hours = 72
         self.backcast_hours = 72
-        self.curve_TI = Curve(
-            "TI", points=[(h, ti) for h, ti in zip(range(8760), self.model.TI)]
-        )
-        self.curve_TA = Curve(
-            "TA", points=[(h, ta) for h, ta in zip(range(8760), self.model.TA)]
-        )
+        self.curve_TI = Curve("TI", self.model.TI)
+        self.curve_TA = Curve("TA", self.model.TA)
         self.curve_comfort_min = Curve(
-            "Minimum comfort temperature",
-            points=[(h, p) for h, p in zip(range(8760), self.model.comfort.TI_minimum_setpoints)]
+            "Minimum comfort temperature", self.model.comfort.TI_minimum_setpoints
         )
         self.curve_comfort_max = Curve(
-            "Minimum comfort temperature",
-            points=[(h, p) for h, p in zip(range(8760), self.model.comfort.TI_maximum_setpoints)],
-        )
-        self.curve_co2 = Curve(
-            "CO2 Intensity",
-            points=[(h, co2 * 200) for h, co2 in zip(range(8760), self.model.CO2)],
+            "Maximum comfort temperature", self.model.comfort.TI_maximum_setpoints
         )
+        self.curve_co2 = Curve("CO2 Intensity", self.model.CO2 * 200)
+        if self.autopilot is not None:
+            self.autopilot.prepare(self.model)
         self.cleanup()
 
     def update(self, hours: int):
-        for _ in range(hours):
+        """advances the game by hours with the current heat/cool input
+
+        the input is constant for the whole call, so the hours are simulated
+        in blocks (see EnergyModel.fast_forward) up to the end of the model
+        year or the final hour
+        """
+        autopilot = self.autopilot
+        while hours > 0:
             year, self._mh = divmod(self.hour, 8760)
-            
+
             if self._mh == self.final_hour_of_the_year:
                 return
-                # print("next year")
-                # self.next_year(year)
-
-            self.model.timestep(hour=self._mh)
-
-            if self.heat_on:
-                self.model.apply_heat(self._mh)
-            if self.cool_on:
-                self.model.apply_cool(self._mh)
-
-            self.model.calc_ED(self._mh)
-            self.money -= self.model.ED[self._mh] * self.model.price_grid
-            self.model.comfort_score_tsd[self._mh] = self.model.comfort.comfort_score(self.model.TI[self._mh])
 
-            self.curve_TI.update((self.hour, self.TI))
-
-            self.hour += 1
+            n = min(hours, 8760 - self._mh)
+            if self._mh < self.final_hour_of_the_year:
+                n = min(n, self.final_hour_of_the_year - self._mh)
+            if autopilot is not None:  # decides every hour
+                n = 1
+                self.heat_on, self.cool_on = self.autopilot_input(autopilot)
+            self.fast_forward(n)
+            hours -= n
+
+    def fast_forward(self, n):
+        """simulates the n hours from the current hour, all within one model year"""
+        start, stop = self._mh, self._mh + n
+        t = slice(start, stop)
+        self.model.fast_forward(start, stop, heat=self.heat_on, cool=self.cool_on)
+
+        price = self.model.price_grid
+        money = self.money
+        for ED in self.model.ED[t].tolist():  # same rounding as hour by hour
+            money -= ED * price
+        self.money = money
+        self.model.comfort_score_tsd[t] = self.model.comfort.comfort_scores(self.model.TI[t])
+        self.curve_TI.update_range(self.hour, self.model.TI[t])
+
+        self.hour += n
+        self._mh = stop - 1
+
+    def hours_to_next_day(self):
+        return 24 - self.hour % 24
+
+    def skip_to_next_day(self):
+        """fast forwards to the next midnight with the current input"""
+        self.update(self.hours_to_next_day())
 
     def next_year(self, year=2020):
         self.hour = 0
@@ -180,7 +322,14 @@ class GameModel:
         self.model.init_sim(TI_init=self.model.TI[-1])
 
     def set_speed(self, simhours_per_second):
-        """sets how many hours should be simulated for each second of the game"""
+        """sets how many hours should be simulated for each second of the game
+
+        the autopilot plays at most autopilot_speed hours per second, each of
+        its hourly solves gets half of an hour's share of the second
+        """
+        if self.autopilot is not None:
+            simhours_per_second = min(simhours_per_second, self.autopilot_speed)
+            self.autopilot.time_budget = min(0.01, 0.5 / simhours_per_second)
         self.speed = simhours_per_second
 
     def set_cop(self, cop):
@@ -228,6 +377,32 @@ class GameModel:
     def cool(self):
         self.cool_on = True
 
+    def toggle_autopilot(self, objective="cost"):
+        """lets a model predictive controller (see model/mpc.py) play the comfort curves
+
+        a benchmark opponent: it plans 12 hours ahead with the same money
+        rules as the player, compare its money and comfort with your own.
+        Call it where update() runs (SimulationScheduler.toggle_autopilot).
+        """
+        if self.autopilot is None:
+            autopilot = MPCController(
+                horizon=12, objective=objective, limits=comfort_curves,
+                time_budget=0.01, use_pv=False,
+            )
+            autopilot.prepare(self.model)
+            self.autopilot = autopilot
+            self.set_speed(self.speed)
+        else:
+            self.autopilot = None
+
+        print(f"Autopilot is {'on' if self.autopilot is not None else 'off'} at {self.speed} h/s")
+
+    def autopilot_input(self, autopilot):
+        """(heat, cool) of the autopilot for the current hour, the heat pump is on or off in the game"""
+        ED_QH, ED_QC = autopilot.decide(self.model, self._mh)
+        HVAC = self.model.HVAC
+        return ED_QH >= HVAC.HP_heating_power / 2, ED_QC >= HVAC.HP_cooling_power / 2
+
     def cleanup(self):
         """cleans up logic and other flags for the next time step"""
         self.heat_on = False
@@ -249,9 +424,23 @@ class GameModel:
     def get_hvac_data(self) -> dict:
         return {"lines": self.model.HVAC.__repr__()}
 
+    def preview_upgrades(self):
+        """starts simulating the outcomes of the upgrades in the background"""
+        self.upgrade_outcomes.start(self.model, self.upgrades)
+
+    def get_upgrade_data(self) -> list:
+        """the upgrades with their estimated outcome (None while it is computed)"""
+        return [
+            {**upgrade, "outcome": self.upgrade_outcomes.estimate(self.model, [upgrade])}
+            if upgrade["available"]
+            else upgrade
+            for upgrade in self.upgrades
+        ]
+
     def get_menu_data(self) -> dict:
         return {
-            "upgrades": self.upgrades,
+            "upgrades": self.get_upgrade_data(),
+            "previews pending": self.upgrade_outcomes.pending > 0,
             "player": {"money": round(self.money,0)},
             "hull": self.get_hull_data(),
             "hvac": self.get_hvac_data(),
@@ -261,15 +450,12 @@ class GameModel:
         fc_index = self.hour + self.forecast_hours
         bc_index = self.hour - self.backcast_hours
         return {
-            "Indoor Temperature": self.curve_TI.points_in_game(bc_index, self.hour),
-            "Outdoor Temperature": self.curve_TA.points_in_game(bc_index, fc_index),
-            "Carbon Intensity": self.curve_co2.points_in_game(bc_index, fc_index),
-            "Minimum Comfort Temperature": self.curve_comfort_min.points_in_game(
-                bc_index, fc_index
-            ),
-            "Maximum Comfort Temperature": self.curve_comfort_max.points_in_game(
-                bc_index, fc_index
-            ),
+            # (curve, first game hour, end game hour), cut to the view by the renderer
+            "Indoor Temperature": (self.curve_TI, bc_index, self.hour),
+            "Outdoor Temperature": (self.curve_TA, bc_index, fc_index),
+            "Carbon Intensity": (self.curve_co2, bc_index, fc_index),
+            "Minimum Comfort Temperature": (self.curve_comfort_min, bc_index, fc_index),
+            "Maximum Comfort Temperature": (self.curve_comfort_max, bc_index, fc_index),
             "TI Indicator": {
                 "Position": self.position,
                 "Comfort dT": self.model.comfort.comfort_diff(self.model.TI[self._mh]),
@@ -324,16 +510,17 @@ class GameModel:
 if __name__ == "__main__":
     # test = GameModel(start_hour=7888)
     # print(test.get_curves_data())
-    c = Curve("test", points=[(x, x) for x in range(8760)])
+    c = Curve("test", np.arange(8760))
     print(c.points_in_game(8755, 8765))
-    c.update((8760, "hello changed 8760"))
+    c.update((8760, -1))
     print(c.points_in_game(8755, 8765))
 
     c.update(
         [
-            (8761, "list of points 1"),
-            (8762, "list of points 2"),
-            (8765, "dont need to be in sequence"),
+            (8761, -2),
+            (8762, -3),
+            (8765, -6),  # dont need to be in sequence
         ]
     )
-    print(c.points_in_game(8755, 8766))
+    print(c.window(8755, 8766))
+    print(c.lod_window(8700, 8800, level=4))
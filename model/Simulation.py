@@ -1,7 +1,8 @@
 import numpy as np
 import pandas as pd
 from pathlib import Path
-import matplotlib.pyplot as plt
+from functools import lru_cache
+from concurrent.futures import CancelledError
 
 import sys
 
@@ -13,6 +14,8 @@ DEFAULT_PATH_BUILDING = Path("building_oib_16linie.xlsx")
 DEFAULT_PATH_PV = Path("pv_1kWp.csv")
 DEFAULT_PATH_USAGES = Path("usage_profiles.csv")
 
+CHECK_HOURS = 730  # how often simulate() checks whether it was cancelled, about a month
+
 
 
 from model import conversion
@@ -20,6 +23,25 @@ from model.Comfort import Comfortmodel
 from model.Building import Building
 from model.PV import PV
 from model.Battery import Battery
+from model.control import setpoints
+from model.results import ResultStore
+
+# matplotlib and argparse are only imported inside the plotting / CLI functions,
+# so the game and pool workers don't pay for them at import time
+
+
+@lru_cache(maxsize=None)
+def load_usage(path=Path(DATA_PATH, DEFAULT_PATH_USAGES)):
+    """usage profiles, read once per process"""
+    return pd.read_csv(path, encoding="cp1252")
+
+
+@lru_cache(maxsize=None)
+def load_array(path, **kwargs):
+    """read-only numpy array of a text file, read once per process"""
+    array = np.genfromtxt(path, **kwargs)
+    array.flags.writeable = False
+    return array
 
 
 class HVACSYSTEM:
@@ -50,14 +72,16 @@ class EnergyModel:
         self,
         building_path=Path(DATA_PATH, DEFAULT_PATH_BUILDING),
         kWp=1,  # PV kWp
-        battery_kWh=1,
-    ):  # Battery kWh
+        battery_kWh=1,  # Battery kWh
+        seed=None,  # comfort setpoint seed, same seed -> same setpoints
+        dtype=np.float64,  # of the result timeseries, np.float32 halves their memory
+    ):
 
         ###### Compononets #####
         # (Other classes and parts, that form the model)
         self.building = Building(path=building_path)
         self.HVAC = HVACSYSTEM()
-        self.comfort = Comfortmodel()
+        self.comfort = Comfortmodel(seed=seed)
 
         self.PV = PV(csv=Path(DATA_PATH, DEFAULT_PATH_PV), kWp=1)
         self.PV.set_kWp(kWp)
@@ -70,17 +94,25 @@ class EnergyModel:
         self.price_grid = 0.19  # €/kWh
         self.price_feedin = 0.05  # €/kWh
 
+        # HVAC control strategy, see model/control.py
+        self.control = setpoints
+        self.controls = None  # its hourly setpoints, set by simulate()
+
         ###### Timeseries #####
         # load Usage characteristics
         self.include_user_plugloads = False
-        self.Usage = pd.read_csv(
-            Path(DATA_PATH, DEFAULT_PATH_USAGES), encoding="cp1252"
-        )
+        self.Usage = load_usage().copy()
 
         # load climate data
-        self.TA = np.genfromtxt(Path(DATA_PATH, "climate.csv"), delimiter=";")[1:, 1]
+        self.TA = load_array(Path(DATA_PATH, "climate.csv"), delimiter=";")[1:, 1]
         # load solar gains
-        self.QS = np.genfromtxt(Path(DATA_PATH, "Solar_gains.csv"))  # W/m²
+        self.QS = load_array(Path(DATA_PATH, "Solar_gains.csv"))  # W/m²
+
+        # result timeseries: one block, self.QV, self.TI, ... are views of its rows
+        self.results = ResultStore(dtype=dtype)
+        for name in self.results.columns:
+            setattr(self, name, self.results[name])
+        self.sums = {}  # annual sums of the columns simulate_summary() didn't keep
 
         self.simulated = False
 
@@ -98,38 +130,17 @@ class EnergyModel:
         # (re)load PV profiles
         # this is neccessary  if the PV model has changed inbetween simulations
         self.PV_prod = self.PV.TSD * 1000 / self.building.bgf  # everything is in Wh/m²
-        self.PV_use = np.zeros(8760)
-        self.PV_feedin = np.zeros(8760)
-        self.PV_to_battery = np.zeros(8760)
 
-        # initialize result arrays
+        # reset result arrays (QV, QT, QI, Q_loss, TI, QH, QC, ED_*, PV_*, Btt_to_ED,
+        # comfort_score_tsd) in place, see model/results.py
         self.timestamp = self.comfort.timestamp
-
-        self.QV = np.zeros(8760)  # ventilation losses
-        self.QT = np.zeros(8760)  # transmission losses
-        self.QI = np.zeros(8760)  # Internal losses/gains
-        self.Q_loss = np.zeros(8760)  # total losses without heating/cooling
-
-        self.TI = np.ones(8760)*20  # indoor temperature
-
-        self.QH = np.zeros(8760)  # Heating demand Wh/m²
-        self.QC = np.zeros(8760)  # Cooling demand Wh/m²
-
-        # Energy demands
-        self.ED_QH = np.zeros(8760)  # Electricity demand for heating Wh/m²
-        self.ED_QC = np.zeros(8760)  # Electricity demand for cooling Wh/m²
-        # self.ED_Qdhw = 0
-        self.ED = np.zeros(8760)  # Electricity demand Wh/m²
-        self.ED_grid = np.zeros(8760)
-
-        self.Btt_to_ED = np.zeros(8760)
+        self.results.reset()
+        self.sums = {}  # annual sums of the columns simulate_summary() didn't keep
 
         self.CO2 = conversion.get_default_co2_profile(
             conversion.DEFAULT_PROFILES.ElectricityMap2018
         )
 
-        self.comfort_score_tsd = np.zeros(8760)
-
         ## initialize starting conditions
         
         self.TI[0:start_hour] = TI_init
@@ -175,47 +186,37 @@ class EnergyModel:
         """cp = spec. building heat_capacity"""
         return TI_before + Q / self.building.heat_capacity # W/m²K
 
+    def start_control(self):
+        """hourly setpoints of self.control for the coming simulation, see model/control.py"""
+        self.controls = self.control(self)
+        self.heating_active = self.cooling_active = False
+
     def is_heating_on(self, t, TI_new):
-        if not self.HVAC.heating_system:
-            return False
-        if not self.comfort.heating_season(t):
-            return False
-        if TI_new > self.comfort.minimum_room_temperature:
-            return False
-        return True
+        """below heat_on, or still heating towards heat_off (hysteresis)"""
+        c = self.controls
+        self.heating_active = TI_new <= c.heat_on[t] or (
+            self.heating_active and TI_new < c.heat_off[t]
+        )
+        return self.heating_active
 
     def is_cooling_on(self, t, TI_new):
         """
         Determines, whether all conditions are met to use cooling
         """
-        c1 = self.HVAC.cooling_system == True
-        c2 = self.comfort.cooling_season(t)
-        c3 = TI_new > self.comfort.maximum_room_temperature
-        return all(
-            [c1, c2, c3]
-        )  # returns True if all conditions are true, False otherwise. similarly, any(). You can stack this way more cleanly
-
-    def minimum_Q(self, TI):
-        """calculates the minimum Q (positive or negative) to reach the setpoint targets"""
-        set_min, set_max = (
-            self.comfort.minimum_room_temperature,
-            self.comfort.maximum_room_temperature,
+        c = self.controls
+        self.cooling_active = TI_new > c.cool_on[t] or (
+            self.cooling_active and TI_new > c.cool_off[t]
         )
-        if TI < set_min:
-            return (set_min - TI) * self.building.heat_capacity
-        if TI > set_max:
-            return (set_max - TI) * self.building.heat_capacity
-        else:
-            return 0.0
+        return self.cooling_active
 
     def handle_heating(self, t):
         """Handles the use of a heating system, applies changes to self.QH, self.ED_QH, self.TI if neccessary"""
         TI = self.TI[t]
         if self.is_heating_on(t, TI):
-            required_QH = self.minimum_Q(TI=TI)
+            required_QH = (self.controls.heat_off[t] - TI) * self.building.heat_capacity
             required_ED = required_QH / self.HVAC.HP_COP / self.HVAC.heating_eff
 
-            available_power = self.HVAC.HP_heating_power
+            available_power = self.controls.heat_power[t]
 
             self.ED_QH[t] = min(required_ED, available_power)
             self.QH[t] = self.ED_QH[t] * self.HVAC.HP_COP * self.HVAC.heating_eff
@@ -241,10 +242,10 @@ class EnergyModel:
         """Handles the use of a heating system, applies changes to self.QH, self.ED_QH, self.TI if neccessary"""
         TI = self.TI[t]
         if self.is_cooling_on(t, TI):
-            required_QC = self.minimum_Q(TI=TI)
+            required_QC = (self.controls.cool_off[t] - TI) * self.building.heat_capacity
             required_ED = -required_QC / self.HVAC.HP_COP / self.HVAC.heating_eff
 
-            available_power = self.HVAC.HP_heating_power
+            available_power = self.controls.cool_power[t]
 
             self.ED_QC[t] = min(required_ED, available_power)
             self.QC[t] = -self.ED_QC[t] * self.HVAC.HP_COP * self.HVAC.heating_eff
@@ -301,8 +302,8 @@ class EnergyModel:
             + self.battery.cost
         )
         self.operational_cost = self.building.bgf * (
-            -self.PV_feedin.sum() / 1000 * self.price_feedin
-            + self.ED_grid.sum() / 1000 * self.price_grid
+            -self.annual_sum("PV_feedin") / 1000 * self.price_feedin
+            + self.annual_sum("ED_grid") / 1000 * self.price_grid
         )
 
         self.total_cost = self.investment_cost + self.operational_cost * years
@@ -320,8 +321,77 @@ class EnergyModel:
         self.calc_QI(hour)
         self.handle_losses(hour)
 
-    def simulate(self):
+    def fast_forward(self, start, stop, heat=False, cool=False):
+        """timestep, apply_heat/apply_cool (if heat/cool) and calc_ED for the hours start..stop-1
+
+        Gives the same results as calling the hourly methods: everything that
+        doesn't depend on TI is computed on whole arrays, only the TI recurrence
+        runs per hour, on plain floats in the same order of operations.
+        """
+        t = slice(start, stop)
+        C = self.building.heat_capacity
+
+        heating, cooling = self.comfort.heating_seasons(t), self.comfort.cooling_seasons(t)
+        self.QI[t] = np.where(
+            heating == cooling,
+            (self.QI_winter[t] + self.QI_summer[t]) / 2,
+            np.where(heating, self.QI_winter[t], self.QI_summer[t]),
+        )
+        if heat:
+            self.ED_QH[t] = self.HVAC.HP_heating_power
+            self.QH[t] = self.ED_QH[t] * self.HVAC.HP_COP * self.HVAC.heating_eff
+        if cool:
+            self.ED_QC[t] = self.HVAC.HP_cooling_power
+            self.QC[t] = -self.ED_QC[t] * self.HVAC.HP_COP * self.HVAC.heating_eff
+
+        previous = np.arange(start, stop) - 1  # hour 0 looks back at hour -1, like timestep
+        TA = self.TA[previous].tolist()
+        airchange = (
+            (self.ACH_I[t] + self.ACH_V[t]) * self.building.net_storey_height * self.cp_air
+        ).tolist()
+        QS, QI, QH, QC = (a[t].tolist() for a in (self.QS, self.QI, self.QH, self.QC))
+        LT = float(self.building.LT)
+        C = float(C)
+
+        QV, QT, Q_loss, TIs = [], [], [], []
+        TI = float(self.TI[start - 1])
+        for i in range(stop - start):
+            dT = TA[i] - TI
+            qv = airchange[i] * dT
+            qt = LT * dT
+            q_loss = (qt + qv) + QS[i] + QI[i]
+            TI = TI + q_loss / C
+            if heat:
+                TI = TI + QH[i] / C
+            if cool:
+                TI = TI + QC[i] / C
+            QV.append(qv)
+            QT.append(qt)
+            Q_loss.append(q_loss)
+            TIs.append(TI)
+        self.QV[t], self.QT[t], self.Q_loss[t], self.TI[t] = QV, QT, Q_loss, TIs
+
+        self.ED[t] = self.ED_QH[t] + self.ED_QC[t]
+        if self.include_user_plugloads:
+            self.ED[t] += self.ED_user[t]
+
+    def simulate(self, outputs=None, cancelled=None):
+        """simulates the year hour by hour
+
+        outputs: names of the result timeseries to keep (see model/results.py).
+        None keeps all of them, otherwise the faster simulate_summary() runs
+        and only the annual sums of the other ones are kept (in self.sums).
+        cancelled: function of the current hour, checked every CHECK_HOURS
+        hours, the simulation raises CancelledError once it returns True
+        """
+        if outputs is not None:
+            return self.simulate_summary(outputs, cancelled)
+
+        self.sums = {}
+        self.start_control()
         for t in range(1, 8760):
+            if cancelled is not None and t % CHECK_HOURS == 0 and cancelled(t):
+                raise CancelledError(f"simulation cancelled at hour {t}")
             #### Verluste
             self.timestep(hour=t)
 
@@ -345,6 +415,119 @@ class EnergyModel:
 
         self.simulated = True
 
+    def simulate_summary(self, outputs=(), cancelled=None):
+        """simulate() on scalar registers, keeping hourly values only for outputs
+
+        The hourly steps are the same as in simulate(), every other column is
+        only carried as a running sum, see annual_sum(). Good for sweeps that
+        only need calc_cost() and annual results.
+        """
+        columns = self.results.columns
+        unknown = set(outputs) - set(columns)
+        if unknown:
+            raise ValueError(f"Unknown outputs {sorted(unknown)}, choose from {columns}")
+        # registers in the order of the result columns (comfort_score_tsd is not simulated)
+        names = columns[: columns.index("Btt_to_ED") + 1]
+        kept = [(i, []) for i, name in enumerate(names) if name in outputs]
+
+        hours = range(1, 8760)
+        TA, QS = self.TA.tolist(), self.QS.tolist()
+        QI_winter, QI_summer = self.QI_winter.tolist(), self.QI_summer.tolist()
+        ACH = (self.ACH_I + self.ACH_V).tolist()
+        ED_user, PV_prod = self.ED_user.tolist(), self.PV_prod.tolist()
+        heating = self.comfort.heating_seasons(slice(None)).tolist()
+        cooling = self.comfort.cooling_seasons(slice(None)).tolist()
+        self.start_control()
+        heat_on, heat_off, heat_power, cool_on, cool_off, cool_power = (
+            getattr(self.controls, name).tolist()
+            for name in ("heat_on", "heat_off", "heat_power", "cool_on", "cool_off", "cool_power")
+        )
+
+        room_height, cp_air = self.building.net_storey_height, self.cp_air
+        LT, C, bgf = self.building.LT, self.building.heat_capacity, self.building.bgf
+        HVAC, battery = self.HVAC, self.battery
+
+        sums = [0.0] * len(names)
+        TI = float(self.TI[0])
+        heating_active = cooling_active = False
+        for t in hours:
+            if cancelled is not None and t % CHECK_HOURS == 0 and cancelled(t):
+                raise CancelledError(f"simulation cancelled at hour {t}")
+
+            #### Verluste
+            dT = TA[t - 1] - TI
+            QV = ACH[t] * room_height * cp_air * dT
+            QT = LT * dT
+            if heating[t] == cooling[t]:
+                QI = (QI_winter[t] + QI_summer[t]) / 2
+            elif heating[t]:
+                QI = QI_winter[t]
+            else:
+                QI = QI_summer[t]
+            Q_loss = (QT + QV) + QS[t] + QI
+            TI = self.TI_after_Q(TI, Q_loss)
+
+            ### Heizung
+            ED_QH = QH = 0.0
+            heating_active = TI <= heat_on[t] or (heating_active and TI < heat_off[t])
+            if heating_active:
+                required_ED = (heat_off[t] - TI) * C / HVAC.HP_COP / HVAC.heating_eff
+                ED_QH = min(required_ED, heat_power[t])
+                QH = ED_QH * HVAC.HP_COP * HVAC.heating_eff
+                TI = self.TI_after_Q(TI, QH)
+
+            #### Kühlung
+            ED_QC = QC = 0.0
+            cooling_active = TI > cool_on[t] or (cooling_active and TI > cool_off[t])
+            if cooling_active:
+                required_ED = -(cool_off[t] - TI) * C / HVAC.HP_COP / HVAC.heating_eff
+                ED_QC = min(required_ED, cool_power[t])
+                QC = -ED_QC * HVAC.HP_COP * HVAC.heating_eff
+                TI = self.TI_after_Q(TI, QC)
+
+            # calc total energy demand
+            ED = ED_QH + ED_QC
+            if self.include_user_plugloads:
+                ED += ED_user[t]
+
+            # allocate pv
+            PV_use = min(PV_prod[t], ED)
+            remain = PV_prod[t] - PV_use
+            PV_to_battery = battery.charge(remain * bgf / 1000) * 1000 / bgf
+            remain = remain - PV_to_battery
+            PV_feedin = max(remain - ED, 0)
+
+            # discharge battery
+            battery.SoC = (1 - battery.discharge_per_hour) * battery.SoC
+            remaining_ED = (ED - PV_use) * bgf / 1000
+            Btt_to_ED = 0.0
+            if remaining_ED > 0 and battery.SoC > 0:
+                Btt_to_ED = battery.discharge(remaining_ED) * 1000 / bgf
+
+            # handle grid
+            ED_grid = ED - PV_use - Btt_to_ED
+
+            row = (QV, QT, QI, Q_loss, TI, QH, QC, ED_QH, ED_QC, ED, ED_grid,
+                   PV_use, PV_feedin, PV_to_battery, Btt_to_ED)
+            sums = [total + value for total, value in zip(sums, row)]
+            for i, series in kept:
+                series.append(row[i])
+
+        for i, series in kept:
+            self.results[names[i]][1:] = series
+        self.sums = {
+            name: float(self.results[name][0]) + total
+            for name, total in zip(names, sums)
+            if name not in outputs
+        }
+        self.simulated = True
+
+    def annual_sum(self, name):
+        """sum of a result timeseries, also for the ones simulate_summary() didn't keep"""
+        if name in self.sums:
+            return self.sums[name]
+        return self.results[name].sum()
+
     def plot(self, show=True, start=None, end=None):
         """plots heat balance, temperatures, electricity use for given start end end timestamp
         eg:
@@ -352,6 +535,8 @@ class EnergyModel:
         >>> self.plot(start="2021-12-21", end="2021-12-22") # plots 21st of december
 
         """
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(
             2, 2, figsize=(12, 8), sharex=True
         )  # ,figsize=(8,12)) #tight_layout=True)
@@ -480,6 +665,8 @@ class EnergyModel:
 
     def plot_df(self, df, title, ylabel, fig=None, ax=None, start=None, end=None):
         """plots a dataframe with timestamp index"""
+        import matplotlib.pyplot as plt
+
         if (fig, ax) == (None, None):
             fig, ax = plt.subplots(1, 1)
         if start is None or end is None:
@@ -501,11 +688,11 @@ Batterie   {self.battery.capacity} kWh
 """
         if self.simulated:
             string += f"""
-Heizwärmebedarf (QH):       {self.QH.sum() / 1000:>5.1f} kWh/m²BGFa
-Kühlbedarf (QC):            {-self.QC.sum() / 1000:>5.1f} kWh/m²BGFa
-Strombedarf (ED):           {self.ED.sum() / 1000:>5.1f} kWh/m²BGFa
-PV Eigenverbrauch (PV_use): {self.PV_use.sum() / 1000:>5.1f} kWh/m²BGFa
-Netzstrom (ED_grid):        {self.ED_grid.sum() / 1000:>5.1f} kWh/m²BGFa
+Heizwärmebedarf (QH):       {self.annual_sum("QH") / 1000:>5.1f} kWh/m²BGFa
+Kühlbedarf (QC):            {-self.annual_sum("QC") / 1000:>5.1f} kWh/m²BGFa
+Strombedarf (ED):           {self.annual_sum("ED") / 1000:>5.1f} kWh/m²BGFa
+PV Eigenverbrauch (PV_use): {self.annual_sum("PV_use") / 1000:>5.1f} kWh/m²BGFa
+Netzstrom (ED_grid):        {self.annual_sum("ED_grid") / 1000:>5.1f} kWh/m²BGFa
 {"-" * (width + 20)}
 Investkosten:               {self.investment_cost:>10.0f} €
 Betriebskosten pro Jahr:   ({self.operational_cost:>10.0f} €/a)
@@ -514,10 +701,9 @@ Gesamtkosten:               {self.total_cost:>10.0f} €"""
         return string
 
 
-import argparse
-
-
 def parse_args():
+    import argparse
+
     parser = argparse.ArgumentParser(description="Run energy model simulation.")
     parser.add_argument("--kwp", type=float, default=50, help="PV system size in kWp")
     parser.add_argument(
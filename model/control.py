@@ -0,0 +1,216 @@
+"""HVAC control strategies for the EnergyModel
+
+A strategy is a function strategy(model) -> Control, called once per
+simulation after init_sim(). It returns the hourly thresholds, targets and
+power limits of the heat pump as whole arrays, computed in bulk with numpy.
+Only the thermostat itself (see EnergyModel.simulate_summary) runs per hour,
+so any strategy costs the same as the default one:
+
+>>> model.control = preheat(signal="co2", boost=2)
+>>> model.init_sim()
+>>> model.simulate(outputs=("TI",))
+
+Strategies that take a base strategy modify its Control, so they stack:
+pv_surplus(base=thermostat(hysteresis=1)).
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Control:
+    """Hourly setpoints of the heat pump, all arrays of 8760 hours
+
+    Heating switches on when TI <= heat_on and then heats towards heat_off
+    until it is reached (heat_off > heat_on gives a hysteresis), cooling
+    likewise above cool_on towards cool_off. -inf / inf switch it off.
+    The power limits are electric, in W/m² like HVACSYSTEM.
+    """
+
+    heat_on: np.ndarray
+    heat_off: np.ndarray
+    heat_power: np.ndarray
+    cool_on: np.ndarray
+    cool_off: np.ndarray
+    cool_power: np.ndarray
+
+    def shift_heating(self, mask, dT):
+        """raises the heating setpoints by dT where mask, e.g. to preheat"""
+        return replace(
+            self,
+            heat_on=np.where(mask, self.heat_on + dT, self.heat_on),
+            heat_off=np.where(mask, self.heat_off + dT, self.heat_off),
+        )
+
+    def shift_cooling(self, mask, dT):
+        """lowers the cooling setpoints by dT where mask, e.g. to precool"""
+        return replace(
+            self,
+            cool_on=np.where(mask, self.cool_on - dT, self.cool_on),
+            cool_off=np.where(mask, self.cool_off - dT, self.cool_off),
+        )
+
+
+def setpoint_control(model, minimum, maximum, hysteresis=0.0) -> Control:
+    """heats up to minimum and cools down to maximum in their seasons"""
+    hours = slice(None)
+    heating = model.comfort.heating_seasons(hours) & bool(model.HVAC.heating_system)
+    cooling = model.comfort.cooling_seasons(hours) & (model.HVAC.cooling_system == True)
+    minimum = np.broadcast_to(np.asarray(minimum, dtype=float), heating.shape)
+    maximum = np.broadcast_to(np.asarray(maximum, dtype=float), cooling.shape)
+    return Control(
+        heat_on=np.where(heating, minimum, -np.inf),
+        heat_off=np.where(heating, minimum + hysteresis, -np.inf),
+        heat_power=np.full(len(heating), float(model.HVAC.HP_heating_power)),
+        cool_on=np.where(cooling, maximum, np.inf),
+        cool_off=np.where(cooling, maximum - hysteresis, np.inf),
+        # handle_cooling has always been limited by the heating power
+        cool_power=np.full(len(cooling), float(model.HVAC.HP_heating_power)),
+    )
+
+
+def setpoints(model) -> Control:
+    """the default: the constant comfort temperatures of model.comfort"""
+    return setpoint_control(
+        model,
+        model.comfort.minimum_room_temperature,
+        model.comfort.maximum_room_temperature,
+    )
+
+
+def thermostat(hysteresis=1.0, base=setpoints):
+    """on at the setpoints of base, off hysteresis K past them (fewer, longer runs)"""
+
+    def strategy(model) -> Control:
+        control = base(model)
+        return replace(
+            control,
+            heat_off=control.heat_off + hysteresis,
+            cool_off=control.cool_off - hysteresis,
+        )
+
+    return strategy
+
+
+def hourly_setpoints(minimum=None, maximum=None, hysteresis=0.0):
+    """hourly minimum and maximum arrays, the seeded comfort setpoints by default"""
+
+    def strategy(model) -> Control:
+        return setpoint_control(
+            model,
+            model.comfort.TI_minimum_setpoints if minimum is None else minimum,
+            model.comfort.TI_maximum_setpoints if maximum is None else maximum,
+            hysteresis,
+        )
+
+    return strategy
+
+
+def cheap_hours(signal, fraction=0.25, period=24):
+    """mask of the hours whose signal is among the lowest fraction of their period
+
+    hours tied with the fraction quantile of their period all count as cheap,
+    except in flat periods, which have no cheap hours. A signal that is flat
+    in every period raises ValueError.
+    """
+    signal = np.asarray(signal, dtype=float)
+    if len(signal) % period:
+        raise ValueError(f"period {period} must divide the {len(signal)} hours")
+    days = signal.reshape(-1, period)
+    flat = np.ptp(days, axis=1, keepdims=True) == 0
+    if flat.all():
+        raise ValueError("signal is flat in every period, no hour is cheaper than another")
+    limits = np.quantile(days, fraction, axis=1, keepdims=True)
+    return ((days <= limits) & ~flat).ravel()
+
+
+def preheat(signal="co2", boost=2.0, fraction=0.25, period=24, base=setpoints):
+    """raises the heating setpoints by boost K in the cheapest hours of each period
+
+    signal: "co2" (model.CO2), "price" (model.price_grid) or an array of 8760
+    hourly values, e.g. a tariff. The building stores the extra heat and
+    needs less in the expensive hours after. Flat periods are not boosted, a
+    signal flat in every period, like the default price_grid, raises ValueError.
+    """
+
+    def strategy(model) -> Control:
+        if isinstance(signal, str):
+            if signal not in ("co2", "price"):
+                raise ValueError(f"Unknown signal {signal!r}, choose 'co2', 'price' or an array")
+            values = model.CO2 if signal == "co2" else model.price_grid
+        else:
+            values = signal
+        values = np.broadcast_to(np.asarray(values, dtype=float), model.TA.shape)
+        return base(model).shift_heating(cheap_hours(values, fraction, period), boost)
+
+    return strategy
+
+
+def pv_surplus(boost=2.0, threshold=0.0, base=setpoints):
+    """heats (or cools) boost K further while the PV produces more than the plug loads
+
+    threshold: surplus in W/m² the PV must exceed before the setpoints move
+    """
+
+    def strategy(model) -> Control:
+        load = model.ED_user if model.include_user_plugloads else 0.0
+        surplus = model.PV_prod - load > threshold
+        return base(model).shift_heating(surplus, boost).shift_cooling(surplus, boost)
+
+    return strategy
+
+
+STRATEGIES = {
+    "setpoints": setpoints,
+    "thermostat": thermostat(),
+    "hourly setpoints": hourly_setpoints(),
+    "CO2 preheating": preheat("co2"),
+    "PV surplus": pv_surplus(),
+}
+
+
+def compare(strategies=STRATEGIES, library=None, seed=0):
+    """annual results of every strategy on every building of library (or the default one)
+
+    returns a DataFrame indexed by (building, strategy), one EnergyModel is
+    reused for all runs with the summary-only simulate().
+    """
+    from pathlib import Path
+
+    import pandas as pd
+
+    from model.Battery import Battery
+    from model.Simulation import EnergyModel
+    from model.upgrades import simulate_outcome
+
+    model = EnergyModel(seed=seed)
+    capacity = model.battery.capacity
+    if library is None:
+        buildings = {Path(model.building.file).stem: model.building}
+    else:
+        buildings = {name: library[name] for name in library}
+
+    rows = {}
+    for building_name, building in buildings.items():
+        model.building = building
+        for name, strategy in strategies.items():
+            model.control = strategy
+            model.battery = Battery(kWh=capacity)  # empty, like a new model
+            outcome = simulate_outcome(model)
+            rows[building_name, name] = {
+                "heating": model.annual_sum("QH") / 1000,  # kWh/m²a
+                "cooling": -model.annual_sum("QC") / 1000,  # kWh/m²a
+                "grid": model.annual_sum("ED_grid") / 1000,  # kWh/m²a
+                **outcome,
+            }
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis(["building", "strategy"])
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.append(str(Path(__file__).parent.parent))  # run as python model/control.py
+
+    print(compare().round(1).to_string())
@@ -1,4 +1,5 @@
 import sys
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
 import pandas as pd
@@ -23,17 +24,25 @@ class DEFAULT_PROFILES:
     ElectricityMap2018 = "Electricity Map 2018"
 
 
+@lru_cache(maxsize=None)
+def read_sheet(file_name, sheet_name) -> pd.DataFrame:
+    """excel sheets are slow to parse, so each sheet is read once per process"""
+    return pd.read_excel(file_name, sheet_name=sheet_name)
+
+
 def get_profile(
     file_name,
     sheet_name,
     profile: str,
 ) -> np.array:
-    df = pd.read_excel(file_name, sheet_name=sheet_name)
+    df = read_sheet(file_name, sheet_name)
     if profile not in df.columns:
         raise ValueError(
             "Profile {profile} not found in Conversion File {CONVERSION_FILE} column headers."
         )
-    return df[profile].to_numpy()
+    array = df[profile].to_numpy(copy=True)
+    array.flags.writeable = False
+    return array
 
 
 def get_default_pee_profile(profile: str):
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from model.Building import PARAMS, Building, Component, hull_LT, read_definition
+
+
+class BuildingLibrary:
+    """Indexed collection of building definitions, e.g. all variants of a study
+
+    The parameters of all buildings are kept in one (buildings x params) float
+    table, so they can be filtered without creating Building objects:
+
+    >>> library = BuildingLibrary.load("variants")  # converted with convert_workbook
+    >>> library.where(differential_cost=0, LT=(0, 0.4))
+    ['oib_16linie', 'oib_16linie_dach']
+    >>> building = library["oib_16linie_dach"]
+    """
+
+    def __init__(self, definitions: dict):
+        self.definitions = dict(definitions)  # name -> definition, see read_definition
+        self.names = list(self.definitions)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._buildings = {}
+
+        # every parameter any building defines, missing ones are nan
+        self.columns = list(PARAMS) + sorted(
+            {p for d in self.definitions.values() for p in d["params"]} - set(PARAMS)
+        ) + ["LT"]
+        self.table = np.full((len(self.names), len(self.columns)), np.nan)
+        for i, definition in enumerate(self.definitions.values()):
+            for j, column in enumerate(self.columns[:-1]):
+                if column in definition["params"]:
+                    self.table[i, j] = definition["params"][column]["value"]
+        # derived from the hull, so it can be filtered like a parameter
+        self.table[:, -1] = [
+            hull_LT(
+                [Component(row) for row in definition["thermal_hull"]],
+                definition["params"]["gross_floor_area"]["value"],
+            )
+            for definition in self.definitions.values()
+        ]
+
+    @classmethod
+    def load(cls, directory, patterns=("*.json",), workers=None):
+        """reads all building definitions in directory in parallel (named by file stem)
+
+        patterns=("*.json", "*.xlsx") also reads excel workbooks, json wins if both exist
+        """
+        files = {}
+        for pattern in reversed(patterns):  # earlier patterns overwrite later ones
+            for path in sorted(Path(directory).glob(pattern)):
+                files[path.stem] = path
+        workers = min(workers or os.cpu_count() or 1, len(files)) or 1
+        if workers == 1:
+            definitions = map(read_definition, files.values())
+            return cls(dict(zip(files, definitions)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(files) // (4 * workers))
+            definitions = pool.map(read_definition, files.values(), chunksize=chunksize)
+            return cls(dict(zip(files, definitions)))
+
+    def __getitem__(self, name) -> Building:
+        """Building of the definition called name, created once"""
+        if name not in self._buildings:
+            self._buildings[name] = Building(name, definition=self.definitions[name])
+        return self._buildings[name]
+
+    def column(self, name) -> np.ndarray:
+        """the parameter name (or "LT") of every building, in the order of self.names"""
+        return self.table[:, self.columns.index(name)]
+
+    def where(self, **conditions) -> list:
+        """names of the buildings whose parameters equal a value or lie within (low, high)"""
+        mask = np.ones(len(self.names), dtype=bool)
+        for name, condition in conditions.items():
+            values = self.column(name)
+            if isinstance(condition, tuple):
+                low, high = condition
+                mask &= (values >= low) & (values <= high)
+            else:
+                mask &= values == condition
+        return [self.names[i] for i in np.flatnonzero(mask)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __repr__(self):
+        return f"BuildingLibrary({len(self)} buildings, {len(self.columns)} params)"
@@ -0,0 +1,374 @@
+"""Model predictive (receding horizon) control of the heat pump
+
+Every hour the controller plans the next `horizon` hours with a small linear
+program and applies the first hour of the plan:
+
+    minimise   signal · grid - feedin · export + comfort_weight · slack
+    subject to RC model of the room temperature (as in EnergyModel.timestep)
+               minimum - slack <= TI <= maximum + slack   (limits of a control strategy)
+               0 <= heat pump power <= limits, electricity balance
+               battery: charge from PV only, power and capacity limits
+
+signal is the grid price ("cost") or the CO2 intensity ("co2"). The LP is
+solved with an interior point method in plain numpy (no solver dependency), which
+warm starts from the shifted plan of the previous hour and stops at a hard
+time budget per hour, so a full year takes a few minutes. An hour whose solve
+stops early follows the last converged plan, or the thermostat at the limits:
+
+>>> model = EnergyModel(kWp=20, battery_kWh=10)
+>>> model.init_sim()
+>>> MPCController(horizon=24, objective="co2").run(model)
+
+or against the thermostat from the command line: python -m model.mpc --objective co2
+"""
+import time
+
+import numpy as np
+
+from model.control import setpoints
+
+# variable blocks of the LP, each `horizon` long (the export is eliminated, see problem())
+HEAT, COOL, GRID, CHARGE, DISCHARGE, SLACK = BLOCKS = range(6)
+ROWS = 10  # constraint blocks
+
+
+def solve_lp(c, A, lower, upper, warm=None, deadline=None, max_iter=50, tolerance=1e-6):
+    """min c·x subject to lower <= A x <= upper, Mehrotra predictor-corrector interior point
+
+    warm: (x, y) to start from, e.g. the shifted solution of the last step,
+    y are the multipliers of the rows of A (> 0 on upper, < 0 on lower bounds).
+    Stops when converged, after max_iter or at perf_counter() time deadline
+    and returns (x, y, iterations, converged), x is the last iterate then.
+    """
+    m, n = A.shape
+    # equilibrate the rows, the constraints mix temperatures and energies
+    scale = 1 / np.maximum(np.abs(A).max(axis=1), 1e-9)
+    A, lower, upper = A * scale[:, None], lower * scale, upper * scale
+    equality = lower == upper
+    has_upper, has_lower = ~equality & np.isfinite(upper), ~equality & np.isfinite(lower)
+    # G x + s = h, s >= 0 and A_eq x = b
+    G = np.vstack([A[has_upper], -A[has_lower]])
+    h = np.concatenate([upper[has_upper], -lower[has_lower]])
+    A_eq, b = A[equality], lower[equality]
+    k, p = len(h), len(b)
+
+    if warm is None:
+        x, z, y_eq = np.zeros(n), np.ones(k), np.zeros(p)
+    else:
+        y = warm[1] / scale
+        x, y_eq = warm[0].copy(), y[equality]
+        # back into the interior, the shifted solution sits on its active bounds
+        z = np.maximum(np.concatenate([y[has_upper], -y[has_lower]]), 1e-2)
+    s = np.maximum(h - G @ x, 1e-2)
+
+    def step_length(v, dv):
+        negative = dv < 0
+        return min(1.0, (-v[negative] / dv[negative]).min()) if negative.any() else 1.0
+
+    converged = False
+    primal_norm = 1 + max(np.abs(h).max(), np.abs(b).max() if p else 0)
+    for iteration in range(1, max_iter + 1):
+        G_z = G.T @ z
+        r_d = c + G_z + A_eq.T @ y_eq
+        r_p = G @ x + s - h
+        r_e = A_eq @ x - b
+        mu = s @ z / k
+        # relative to the terms it balances, the comfort multipliers dwarf c
+        dual_norm = 1 + max(np.abs(c).max(), np.abs(G_z).max())
+        if (max(np.abs(r_p).max(), np.abs(r_e).max() if p else 0) <= tolerance * primal_norm
+                and np.abs(r_d).max() <= tolerance * dual_norm
+                and s @ z <= tolerance * (1 + abs(c @ x))):
+            converged = True
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+        W = z / s
+        KKT = np.zeros((n + p, n + p))
+        KKT[:n, :n] = G.T @ (W[:, None] * G) + 1e-9 * np.eye(n)  # regularized, variables can be fixed
+        KKT[:n, n:], KKT[n:, :n] = A_eq.T, A_eq
+
+        def direction(r_c):
+            rhs = np.concatenate([-r_d - G.T @ (W * r_p - r_c / s), -r_e])
+            d = np.linalg.solve(KKT, rhs)
+            dx, dy = d[:n], d[n:]
+            dz = W * (G @ dx + r_p) - r_c / s
+            ds = -(r_c + s * dz) / z
+            return dx, dy, dz, ds
+
+        # predictor, then centered corrector
+        try:
+            dx, dy, dz, ds = direction(s * z)
+            alpha = min(step_length(s, ds), step_length(z, dz))
+            mu_affine = (s + alpha * ds) @ (z + alpha * dz) / k
+            sigma = (mu_affine / mu) ** 3
+            dx, dy, dz, ds = direction(s * z + ds * dz - sigma * mu)
+        except np.linalg.LinAlgError:  # degenerate, keep the last iterate
+            break
+        alpha = 0.99 * min(step_length(s, ds), step_length(z, dz))
+        x, y_eq = x + alpha * dx, y_eq + alpha * dy
+        s, z = s + alpha * ds, z + alpha * dz
+
+    y = np.zeros(m)
+    y[equality] = y_eq
+    y[has_upper] = z[: has_upper.sum()]
+    y[has_lower] = -z[has_upper.sum():]
+    return x, y * scale, iteration, converged
+
+
+def shift(v, blocks):
+    """moves every block of v one hour ahead, repeating the last hour"""
+    v = v.reshape(blocks, -1)
+    return np.concatenate([v[:, 1:], v[:, -1:]], axis=1).ravel()
+
+
+class MPCController:
+    """Receding horizon control of the heat pump of an EnergyModel
+
+    objective: "cost" (model.price_grid, an hourly array if it is one) or "co2"
+    (model.CO2). limits: control strategy whose heat_on/cool_on are the
+    comfort limits and whose powers limit the heat pump (see model/control.py).
+    comfort_weight: Wh/m² of electricity at the average signal of the horizon
+    one Kh outside the limits is worth. time_budget: seconds per hour.
+    use_pv: False plans without PV and battery (like the money in the game).
+    """
+
+    def __init__(self, horizon=24, objective="cost", limits=setpoints, comfort_weight=100.0,
+                 time_budget=0.02, max_iter=50, tolerance=1e-6, use_pv=True):
+        if objective not in ("cost", "co2"):
+            raise ValueError(f"Unknown objective {objective!r}, choose 'cost' or 'co2'")
+        self.horizon = horizon
+        self.objective = objective
+        self.limits = limits
+        self.comfort_weight = comfort_weight
+        self.time_budget = time_budget
+        self.max_iter = max_iter
+        self.tolerance = tolerance
+        self.use_pv = use_pv
+
+        self.control = None  # hourly limits, set by prepare()
+        self.warm = None  # (x, y) of the last solve
+        self.last_plan = None  # x of the last converged solve, shifted to the current hour
+        self.plan_age = 0  # hours since the last converged solve
+        self.solves = self.iterations = self.over_budget = 0
+        self.solve_time = 0.0
+
+    def prepare(self, model):
+        """hourly limits and season loads for the current simulation of model (after init_sim)"""
+        self.control = self.limits(model)
+        heating, cooling = model.comfort.heating_seasons(slice(None)), model.comfort.cooling_seasons(slice(None))
+        self.QI = np.where(
+            heating == cooling,
+            (model.QI_winter + model.QI_summer) / 2,
+            np.where(heating, model.QI_winter, model.QI_summer),
+        )
+        self.warm = self.last_plan = None
+
+    def rc(self, model, hours):
+        """RC model of the room in hours: TI[k] = a[k] TI[k-1] + b[k] + gain (heat[k] - cool[k])"""
+        m, C = model, model.building.heat_capacity
+        gain = m.HVAC.HP_COP * m.HVAC.heating_eff / C  # K per Wh/m² of heat pump electricity
+        H = m.building.LT + (m.ACH_I[hours] + m.ACH_V[hours]) * m.building.net_storey_height * m.cp_air
+        return 1 - H / C, (H * m.TA[hours - 1] + m.QS[hours] + self.QI[hours]) / C, gain
+
+    def problem(self, model, t):
+        """LP (c, A, lower, upper) for the hours t .. t + horizon - 1"""
+        N = self.horizon
+        hours = np.minimum(np.arange(t, t + N), 8759)  # the last hour repeats at the year end
+        m, ctl, battery, bgf = model, self.control, model.battery, model.building.bgf
+
+        a, b, gain = self.rc(m, hours)
+        TI_free = np.empty(N)
+        TI = m.TI[t - 1]
+        for k in range(N):
+            TI = TI_free[k] = a[k] * TI + b[k]
+        decay = np.cumprod(a)
+        M = np.tril(decay[:, None] / decay[None, :]) * gain  # TI response to heat
+
+        # battery in Wh/m², charging from PV only
+        loss = 1 - battery.discharge_per_hour
+        L = np.tril(loss ** (np.arange(N)[:, None] - np.arange(N)[None, :]))
+        SoC_free = battery.SoC * 1000 / bgf * loss ** np.arange(1, N + 1)
+        capacity = battery.capacity * 1000 / bgf if self.use_pv else 0.0
+        load = m.ED_user[hours] if m.include_user_plugloads else np.zeros(N)
+        PV = m.PV_prod[hours] if self.use_pv else np.zeros(N)
+
+        if self.objective == "cost":
+            signal = np.broadcast_to(np.asarray(m.price_grid, dtype=float), m.TA.shape)[hours]
+            feedin = np.broadcast_to(np.asarray(m.price_feedin, dtype=float), m.TA.shape)[hours]
+        else:
+            signal, feedin = m.CO2[hours], np.zeros(N)
+        norm = signal.mean() or 1.0
+
+        # export = grid + PV + discharge - load - heat pump - charge, so
+        # signal·grid - feedin·export = (signal - feedin)·grid + feedin·(heat pump + charge - discharge) + const
+        signal, feedin = signal / norm, feedin / norm
+        c = np.zeros(len(BLOCKS) * N)
+        v = lambda block: slice(block * N, (block + 1) * N)
+        c[v(GRID)] = signal - feedin
+        c[v(HEAT)] = c[v(COOL)] = feedin + 1e-4  # no needless heating and cooling at the same time
+        c[v(CHARGE)], c[v(DISCHARGE)] = feedin, -feedin
+        c[v(SLACK)] = self.comfort_weight
+
+        I = np.eye(N)
+        A = np.zeros((ROWS * N, len(BLOCKS) * N))
+        lower, upper = np.empty(ROWS * N), np.empty(ROWS * N)
+        r = lambda row: slice(row * N, (row + 1) * N)
+        # comfort limits
+        A[r(0), v(HEAT)], A[r(0), v(COOL)], A[r(0), v(SLACK)] = M, -M, I
+        lower[r(0)], upper[r(0)] = ctl.heat_on[hours] - TI_free, np.inf
+        A[r(1), v(HEAT)], A[r(1), v(COOL)], A[r(1), v(SLACK)] = M, -M, -I
+        lower[r(1)], upper[r(1)] = -np.inf, ctl.cool_on[hours] - TI_free
+        # electricity balance: export = grid + PV + discharge - load - heat pump - charge >= 0
+        A[r(2), v(GRID)] = A[r(2), v(DISCHARGE)] = I
+        A[r(2), v(HEAT)] = A[r(2), v(COOL)] = A[r(2), v(CHARGE)] = -I
+        lower[r(2)], upper[r(2)] = load - PV, np.inf
+        # battery state of charge, without a battery it stays unused through its power bounds
+        has_battery = capacity > 0
+        A[r(3), v(CHARGE)] = L * battery.charge_efficiency
+        A[r(3), v(DISCHARGE)] = -L / battery.discharge_efficiency
+        lower[r(3)] = -SoC_free if has_battery else -np.inf
+        upper[r(3)] = capacity - SoC_free if has_battery else np.inf
+        # bounds of the variables
+        heat_power = np.where(np.isfinite(ctl.heat_on[hours]), ctl.heat_power[hours], 0.0)
+        cool_power = np.where(np.isfinite(ctl.cool_on[hours]), ctl.cool_power[hours], 0.0)
+        bounds = {
+            HEAT: heat_power,
+            COOL: cool_power,
+            GRID: np.inf,
+            CHARGE: np.minimum(battery.charge_power_max * 1000 / bgf, PV) * has_battery,
+            DISCHARGE: battery.discharge_power_max * 1000 / bgf * battery.discharge_efficiency * has_battery,
+            SLACK: np.inf,
+        }
+        for block, high in bounds.items():
+            A[r(4 + block), v(block)] = I
+            lower[r(4 + block)], upper[r(4 + block)] = 0.0, high
+        return c, A, lower, upper
+
+    def plan(self, model, t):
+        """solution of the LP for the hours from t, as (x, converged)"""
+        start = time.perf_counter()
+        c, A, lower, upper = self.problem(model, t)
+        warm = None
+        if self.warm is not None:
+            x, y = self.warm
+            warm = shift(x, len(BLOCKS)), shift(y, ROWS)
+        x, y, iterations, converged = solve_lp(
+            c, A, lower, upper, warm,
+            deadline=start + self.time_budget,
+            max_iter=self.max_iter,
+            tolerance=self.tolerance,
+        )
+        self.warm = x, y
+        if converged:
+            self.last_plan, self.plan_age = x, 0
+
+        self.solves += 1
+        self.iterations += iterations
+        self.solve_time += time.perf_counter() - start
+        self.over_budget += not converged
+        return x, converged
+
+    def decide(self, model, t):
+        """electric heating and cooling power (W/m²) for hour t"""
+        if self.control is None:
+            self.prepare(model)
+        x, converged = self.plan(model, t)
+        if not converged:
+            x = self.fallback(model, t)
+        N = self.horizon
+        heat = min(max(x[HEAT * N], 0.0), self.control.heat_power[t])
+        cool = min(max(x[COOL * N], 0.0), self.control.cool_power[t])
+        return float(heat), float(cool)
+
+    def fallback(self, model, t):
+        """plan for hour t when its solve stopped early
+
+        the last converged plan, shifted to t, while it reaches that far,
+        otherwise just enough power to keep the comfort limits, like the thermostat
+        """
+        N = self.horizon
+        self.plan_age += 1
+        if self.last_plan is not None and self.plan_age < N:
+            self.last_plan = shift(self.last_plan, len(BLOCKS))
+            return self.last_plan
+        a, b, gain = self.rc(model, np.array([t]))
+        TI_free = a[0] * model.TI[t - 1] + b[0]
+        x = np.zeros(len(BLOCKS) * N)
+        x[HEAT * N] = (self.control.heat_on[t] - TI_free) / gain
+        x[COOL * N] = (TI_free - self.control.cool_on[t]) / gain
+        return x
+
+    def run(self, model, start=1, stop=8760):
+        """simulates the hours start .. stop-1 with the planned heat pump powers
+
+        like simulate(), hour by hour with the model's own PV and battery
+        rules, the heat pump follows decide() instead of the thermostat
+        """
+        self.prepare(model)
+        HVAC = model.HVAC
+        for t in range(start, stop):
+            ED_QH, ED_QC = self.decide(model, t)
+            model.timestep(hour=t)
+            model.ED_QH[t], model.ED_QC[t] = ED_QH, ED_QC
+            model.QH[t] = ED_QH * HVAC.HP_COP * HVAC.heating_eff
+            model.QC[t] = -ED_QC * HVAC.HP_COP * HVAC.heating_eff
+            model.TI[t] = model.TI_after_Q(model.TI_after_Q(model.TI[t], model.QH[t]), model.QC[t])
+            model.calc_ED(t)
+            model.handle_PV(t)
+            model.handle_battery(t)
+            model.handle_grid(t)
+        model.sums = {}
+        model.simulated = True
+
+    def summary(self) -> str:
+        if not self.solves:
+            return "no solves"
+        return (
+            f"{self.solves} solves, {self.solve_time / self.solves * 1000:.1f} ms "
+            f"and {self.iterations / self.solves:.0f} iterations each, "
+            f"{self.over_budget} stopped early"
+        )
+
+    def __repr__(self):
+        return f"MPCController({self.horizon} h, {self.objective}, {self.summary()})"
+
+
+def parse_args():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Full year MPC run against the thermostat.")
+    parser.add_argument("--objective", choices=["cost", "co2"], default="cost")
+    parser.add_argument("--horizon", type=int, default=24, help="hours")
+    parser.add_argument("--budget", type=float, default=0.02, help="seconds per hour")
+    parser.add_argument("--kwp", type=float, default=20, help="PV system size in kWp")
+    parser.add_argument("--battery", type=float, default=10, help="Battery capacity in kWh")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from model.Simulation import EnergyModel
+    from model.upgrades import simulate_outcome
+
+    args = parse_args()
+    model = EnergyModel(kWp=args.kwp, battery_kWh=args.battery, seed=0)
+    print("thermostat", simulate_outcome(model))
+
+    model = EnergyModel(kWp=args.kwp, battery_kWh=args.battery, seed=0)
+    model.init_sim()
+    controller = MPCController(args.horizon, args.objective, time_budget=args.budget)
+    t = time.perf_counter()
+    controller.run(model)
+    elapsed = time.perf_counter() - t
+    model.calc_cost(verbose=False)
+    TI = model.TI
+    discomfort = (  # like simulate_outcome
+        np.maximum(model.comfort.minimum_room_temperature - TI, 0).sum()
+        + np.maximum(TI - model.comfort.maximum_room_temperature, 0).sum()
+    )
+    print("MPC", {
+        "cost": float(model.operational_cost),
+        "emissions": float((model.ED_grid * model.CO2).sum() * model.building.bgf / 1000),
+        "discomfort": float(discomfort),
+    })
+    print(controller, f"{elapsed:.0f} s")
@@ -0,0 +1,108 @@
+import numpy as np
+from pathlib import Path
+
+# hourly result timeseries of the EnergyModel, in Wh/m² unless noted otherwise
+COLUMNS = (
+    "QV",  # ventilation losses
+    "QT",  # transmission losses
+    "QI",  # internal losses/gains
+    "Q_loss",  # total losses without heating/cooling
+    "TI",  # indoor temperature °C
+    "QH",  # heating demand
+    "QC",  # cooling demand
+    "ED_QH",  # electricity demand for heating
+    "ED_QC",  # electricity demand for cooling
+    "ED",  # electricity demand
+    "ED_grid",
+    "PV_use",
+    "PV_feedin",
+    "PV_to_battery",
+    "Btt_to_ED",
+    "comfort_score_tsd",
+)
+
+# value of a column after reset(), 0 for all others
+INITIAL_VALUES = {"TI": 20.0}
+
+
+class ResultStore:
+    """All hourly results of a simulation in one contiguous (columns x hours) block
+
+    store["TI"] (or store.TI) is a zero-copy view of one row, so the model
+    can keep using its arrays as before while reset() re-initializes every
+    column at once. dtype=np.float32 halves the memory, e.g. for batch jobs
+    that keep many results around.
+    """
+
+    def __init__(self, columns=COLUMNS, hours=8760, dtype=np.float64, data=None):
+        self.columns = tuple(columns)
+        self.hours = hours
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        fresh = data is None
+        if fresh:
+            data = np.empty((len(self.columns), hours), dtype=dtype)
+        elif data.shape != (len(self.columns), hours):
+            raise ValueError(
+                f"data of shape {data.shape} doesn't fit {len(self.columns)} columns x {hours} hours"
+            )
+        self.data = data
+        self.initial = np.array(
+            [INITIAL_VALUES.get(name, 0.0) for name in self.columns], dtype=data.dtype
+        )[:, None]
+        if fresh:
+            self.reset()
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def reset(self):
+        """sets every column to its initial value, without allocating"""
+        self.data[...] = self.initial
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.data[self.index[name]]
+
+    def __getattr__(self, name):
+        # only called for names that aren't regular attributes
+        index = self.__dict__.get("index", {})
+        if name in index:
+            return self.data[index[name]]
+        raise AttributeError(name)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def copy(self, dtype=None) -> "ResultStore":
+        """independent copy (optionally converted to dtype) that survives the next reset()"""
+        return ResultStore(
+            self.columns, self.hours, data=self.data.astype(dtype or self.dtype, copy=True)
+        )
+
+    def as_dict(self) -> dict:
+        return {name: self[name] for name in self.columns}
+
+    def save(self, path, compressed=True):
+        """writes the block and column names to an .npz file"""
+        savez = np.savez_compressed if compressed else np.savez
+        savez(Path(path), data=self.data, columns=np.array(self.columns))
+
+    @classmethod
+    def load(cls, path, dtype=None) -> "ResultStore":
+        with np.load(Path(path)) as npz:
+            data = npz["data"]
+            columns = [str(c) for c in npz["columns"]]
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
+        return cls(columns, data.shape[1], data=data)
+
+    def __repr__(self) -> str:
+        return (
+            f"ResultStore({len(self.columns)} columns x {self.hours} hours, "
+            f"{self.dtype}, {self.nbytes / 1024:.0f} kB)"
+        )
+
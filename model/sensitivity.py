@@ -0,0 +1,302 @@
+"""Global sensitivity analysis (Morris and Sobol) of the annual results of the EnergyModel
+
+>>> result = morris(trajectories=20, workers=8)
+>>> result["cost"].sort_values("mu_star", ascending=False)
+
+or from the command line: python -m model.sensitivity sobol --samples 1024
+
+Samples are evaluated in parallel, one EnergyModel per worker process, with
+the summary-only simulate(outputs=("TI",)), so tens of thousands of runs take
+minutes. Only numpy is needed: the designs are plain (pseudo) random samples.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model.Battery import Battery
+from model.Simulation import DATA_PATH, DEFAULT_PATH_BUILDING, EnergyModel
+
+# name -> (low, high) of the uniformly distributed parameters
+PARAMETERS = {
+    "HP_heating_power": (5.0, 40.0),  # W/m², also limits cooling (see control.setpoint_control)
+    "HP_COP": (2.0, 6.0),
+    "heating_eff": (0.8, 1.0),
+    "u_wall": (0.5, 1.5),  # factors on the U-values of the hull components
+    "u_roof": (0.5, 1.5),
+    "u_floor": (0.5, 1.5),
+    "u_window": (0.5, 1.5),
+    "heat_capacity": (50.0, 300.0),  # Wh/m²K
+    "cp_air": (0.30, 0.36),  # Wh/m³K
+    "ventilation": (0.5, 1.5),  # factor on the air change of the ventilation system
+    "infiltration": (0.5, 1.5),  # factor on the infiltration air change
+    "kWp": (0.0, 100.0),
+    "battery_kWh": (0.0, 50.0),
+}
+
+# hull components scaled by the u_* parameters
+COMPONENTS = {
+    "u_wall": "Aussenwand",
+    "u_roof": "Dach",
+    "u_floor": "Fußboden",
+    "u_window": "Fenster",
+}
+
+OUTPUTS = (
+    "heating",  # kWh/m²a
+    "cooling",  # kWh/m²a
+    "grid",  # grid electricity kWh/m²a
+    "cost",  # total cost after 20 years €
+    "discomfort",  # Kh outside of the comfort temperatures
+)
+
+
+class Evaluator:
+    """Runs the EnergyModel for rows of parameter values, reusing one model"""
+
+    def __init__(self, names, building_path=Path(DATA_PATH, DEFAULT_PATH_BUILDING), seed=0):
+        self.names = list(names)
+        unknown = set(self.names) - set(PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)}, choose from {list(PARAMETERS)}")
+        self.model = EnergyModel(building_path, seed=seed)
+        m = self.model
+        # values every run starts from
+        self.base = {
+            "HP_heating_power": m.HVAC.HP_heating_power,
+            "HP_COP": m.HVAC.HP_COP,
+            "heating_eff": m.HVAC.heating_eff,
+            "heat_capacity": m.building.heat_capacity,
+            "cp_air": m.cp_air,
+            "kWp": m.PV.kWp,
+            "battery_kWh": m.battery.capacity,
+        }
+        self.u_values = [c.u_value for c in m.building.components]
+
+    def apply(self, params):
+        m = self.model
+        values = {**self.base, **params}
+        for name in ("HP_heating_power", "HP_COP", "heating_eff"):
+            setattr(m.HVAC, name, values[name])
+        m.building.heat_capacity = values["heat_capacity"]
+        m.cp_air = values["cp_air"]
+        for component, u_value in zip(m.building.components, self.u_values):
+            factors = [params.get(p, 1.0) for p, c in COMPONENTS.items() if c == component.name]
+            component.u_value = u_value * (factors[0] if factors else 1.0)
+        m.PV.set_kWp(values["kWp"])
+        m.battery = Battery(kWh=values["battery_kWh"])  # empty, like a new model
+
+    def __call__(self, row) -> np.ndarray:
+        """OUTPUTS for one row of parameter values (in the order of self.names)"""
+        params = dict(zip(self.names, row))
+        self.apply(params)
+        m = self.model
+        m.init_sim()
+        m.ACH_V = m.ACH_V * params.get("ventilation", 1.0)
+        m.ACH_I = m.ACH_I * params.get("infiltration", 1.0)
+        m.simulate(outputs=("TI",))
+        cost = m.calc_cost(verbose=False)
+
+        TI = m.TI
+        discomfort = (
+            np.maximum(m.comfort.minimum_room_temperature - TI, 0).sum()
+            + np.maximum(TI - m.comfort.maximum_room_temperature, 0).sum()
+        )
+        return np.array(
+            [
+                m.annual_sum("QH") / 1000,
+                -m.annual_sum("QC") / 1000,
+                m.annual_sum("ED_grid") / 1000,
+                cost,
+                discomfort,
+            ]
+        )
+
+
+# one evaluator per worker process, created by the pool initializer
+_evaluator = None
+
+
+def _init_worker(names, building_path, seed):
+    global _evaluator
+    _evaluator = Evaluator(names, building_path, seed)
+
+
+def _evaluate_rows(rows):
+    return np.array([_evaluator(row) for row in rows])
+
+
+def evaluate(X, names, workers=None, batch_size=32,
+             building_path=Path(DATA_PATH, DEFAULT_PATH_BUILDING), seed=0):
+    """OUTPUTS for every row of X (samples x parameters), in batches on worker processes"""
+    X = np.asarray(X, dtype=float)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(X) <= batch_size:
+        evaluator = Evaluator(names, building_path, seed)
+        return np.array([evaluator(row) for row in X]).reshape(len(X), len(OUTPUTS))
+
+    batches = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(list(names), building_path, seed),
+    ) as pool:
+        return np.concatenate(list(pool.map(_evaluate_rows, batches)))
+
+
+def scale(U, bounds):
+    """maps unit samples to the (low, high) bounds of each column"""
+    low, high = np.asarray(bounds, dtype=float).T
+    return low + U * (high - low)
+
+
+def bootstrap_interval(samples, statistic, num_resamples, conf, rng):
+    """half width of the conf interval of statistic(samples) by resampling the rows"""
+    n = len(samples)
+    resampled = np.array(
+        [statistic(samples[rng.integers(0, n, n)]) for _ in range(num_resamples)]
+    )
+    low, high = np.percentile(resampled, [50 * (1 - conf), 50 * (1 + conf)], axis=0)
+    return (high - low) / 2
+
+
+# Morris elementary effects
+def morris_sample(k, trajectories=20, levels=4, rng=None):
+    """unit samples of trajectories x (k + 1) points, each step changes one parameter
+
+    returns (U, steps): steps[t, i] = (parameter, signed delta) of step i of trajectory t
+    """
+    rng = np.random.default_rng(rng)
+    grid = np.arange(levels) / (levels - 1)
+    delta = levels / (2 * (levels - 1))
+    U = np.empty((trajectories, k + 1, k))
+    steps = np.empty((trajectories, k, 2))
+    for t in range(trajectories):
+        x = rng.choice(grid, size=k)
+        U[t, 0] = x
+        for i, j in enumerate(rng.permutation(k)):
+            d = delta if x[j] + delta <= 1 else -delta
+            x = x.copy()
+            x[j] += d
+            U[t, i + 1] = x
+            steps[t, i] = j, d
+    return U.reshape(-1, k), steps
+
+
+def morris_indices(Y, steps, names, num_resamples=1000, conf=0.95, rng=None):
+    """mu, mu_star (with confidence), sigma of the elementary effects for one output"""
+    rng = np.random.default_rng(rng)
+    trajectories, k, _ = steps.shape
+    Y = np.asarray(Y).reshape(trajectories, k + 1)
+    effects = np.empty((trajectories, k))  # per trajectory and parameter
+    for t in range(trajectories):
+        for i, (j, d) in enumerate(steps[t]):
+            effects[t, int(j)] = (Y[t, i + 1] - Y[t, i]) / d
+    mu_star = lambda e: np.abs(e).mean(axis=0)
+    return pd.DataFrame(
+        {
+            "mu": effects.mean(axis=0),
+            "mu_star": mu_star(effects),
+            "mu_star_conf": bootstrap_interval(effects, mu_star, num_resamples, conf, rng),
+            "sigma": effects.std(axis=0, ddof=1),
+        },
+        index=names,
+    )
+
+
+def morris(parameters=PARAMETERS, trajectories=20, levels=4, workers=None,
+           num_resamples=1000, conf=0.95, seed=None, **kwargs):
+    """Morris screening, returns {output: DataFrame of indices per parameter}"""
+    names = list(parameters)
+    rng = np.random.default_rng(seed)
+    U, steps = morris_sample(len(names), trajectories, levels, rng)
+    Y = evaluate(scale(U, [parameters[n] for n in names]), names, workers, **kwargs)
+    return {
+        output: morris_indices(Y[:, i], steps, names, num_resamples, conf, rng)
+        for i, output in enumerate(OUTPUTS)
+    }
+
+
+# Sobol indices (Saltelli 2010 / Jansen estimators)
+def saltelli_sample(k, n, rng=None):
+    """unit samples: blocks A, B and AB_1 .. AB_k (A with column i from B), n rows each"""
+    rng = np.random.default_rng(rng)
+    A, B = rng.random((n, k)), rng.random((n, k))
+    AB = np.repeat(A[None], k, axis=0)
+    for i in range(k):
+        AB[i, :, i] = B[:, i]
+    return np.concatenate([A, B, AB.reshape(-1, k)])
+
+
+def sobol_indices(Y, k, names, num_resamples=1000, conf=0.95, rng=None):
+    """first order (S1) and total (ST) indices with confidence for one output"""
+    rng = np.random.default_rng(rng)
+    Y = np.asarray(Y)
+    n = len(Y) // (k + 2)
+    # columns: A, B, AB_1 .. AB_k, rows are resampled together
+    blocks = np.column_stack([Y[:n], Y[n:2 * n], Y[2 * n:].reshape(k, n).T])
+
+    def first_order(b):
+        A, B, AB = b[:, 0], b[:, 1], b[:, 2:]
+        return (B[:, None] * (AB - A[:, None])).mean(axis=0) / np.var(b[:, :2])
+
+    def total(b):
+        A, AB = b[:, 0], b[:, 2:]
+        return 0.5 * ((A[:, None] - AB) ** 2).mean(axis=0) / np.var(b[:, :2])
+
+    return pd.DataFrame(
+        {
+            "S1": first_order(blocks),
+            "S1_conf": bootstrap_interval(blocks, first_order, num_resamples, conf, rng),
+            "ST": total(blocks),
+            "ST_conf": bootstrap_interval(blocks, total, num_resamples, conf, rng),
+        },
+        index=names,
+    )
+
+
+def sobol(parameters=PARAMETERS, n=512, workers=None, num_resamples=1000, conf=0.95,
+          seed=None, **kwargs):
+    """Sobol indices from n * (k + 2) runs, returns {output: DataFrame per parameter}"""
+    names = list(parameters)
+    k = len(names)
+    rng = np.random.default_rng(seed)
+    U = saltelli_sample(k, n, rng)
+    Y = evaluate(scale(U, [parameters[n_] for n_ in names]), names, workers, **kwargs)
+    return {
+        output: sobol_indices(Y[:, i], k, names, num_resamples, conf, rng)
+        for i, output in enumerate(OUTPUTS)
+    }
+
+
+def parse_args():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sensitivity of the annual results.")
+    parser.add_argument("method", choices=["morris", "sobol"])
+    parser.add_argument(
+        "--samples", type=int, default=None,
+        help="trajectories (morris, default 20) or base samples (sobol, default 512)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import time
+
+    args = parse_args()
+    t = time.perf_counter()
+    if args.method == "morris":
+        results = morris(trajectories=args.samples or 20, workers=args.workers, seed=args.seed)
+        column = "mu_star"
+    else:
+        results = sobol(n=args.samples or 512, workers=args.workers, seed=args.seed)
+        column = "ST"
+    for output, indices in results.items():
+        print(f"\n{output}")
+        print(indices.sort_values(column, ascending=False).round(3).to_string())
+    print(f"\n{time.perf_counter() - t:.1f} s")
@@ -0,0 +1,173 @@
+import threading
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from model.Battery import Battery
+from model.Simulation import DATA_PATH, DEFAULT_PATH_BUILDING, EnergyModel
+
+
+def model_state(model: EnergyModel) -> dict:
+    """the building and HVAC values the upgrades change, as plain values"""
+    return {
+        "building": str(model.building.file),
+        "u_values": tuple(c.u_value for c in model.building.components),
+        "HP_COP": model.HVAC.HP_COP,
+        "HP_heating_power": model.HVAC.HP_heating_power,
+        "kWp": model.PV.kWp,
+        "battery_kWh": model.battery.capacity,
+    }
+
+
+def state_key(state: dict) -> tuple:
+    return tuple(state.values())
+
+
+def set_state(model: EnergyModel, state: dict):
+    for component, u_value in zip(model.building.components, state["u_values"]):
+        component.u_value = u_value
+    for name in ("HP_COP", "HP_heating_power"):
+        setattr(model.HVAC, name, state[name])
+    model.PV.set_kWp(state["kWp"])
+    model.battery = Battery(kWh=state["battery_kWh"])  # empty, like a new model
+
+
+def apply_upgrades(model: EnergyModel, upgrades):
+    """applies the effects of the upgrade dicts (see GameModel.UPGRADES) to model"""
+    for upgrade in upgrades:
+        for component in model.building.components:
+            component.u_value *= upgrade.get("u_factors", {}).get(component.name, 1.0)
+        model.HVAC.HP_COP += upgrade.get("cop_increase", 0)
+
+
+def simulate_outcome(model: EnergyModel, cancelled=None) -> dict:
+    """annual cost, emissions and comfort of the model in its current state
+
+    cancelled: see EnergyModel.simulate
+    """
+    model.init_sim()
+    model.simulate(outputs=("TI", "ED_grid"), cancelled=cancelled)
+    model.calc_cost(verbose=False)
+    TI = model.TI
+    return {
+        "cost": float(model.operational_cost),  # €/a
+        "emissions": float((model.ED_grid * model.CO2).sum() * model.building.bgf / 1000),  # kg/a
+        "discomfort": float(
+            np.maximum(model.comfort.minimum_room_temperature - TI, 0).sum()
+            + np.maximum(TI - model.comfort.maximum_room_temperature, 0).sum()
+        ),  # Kh/a
+    }
+
+
+# one EnergyModel per worker thread and building, reused for all combinations
+_models = threading.local()
+
+
+def worker_model(building_path, seed=None) -> EnergyModel:
+    models = _models.__dict__.setdefault("models", {})
+    if (building_path, seed) not in models:
+        models[building_path, seed] = EnergyModel(building_path, seed=seed)
+    return models[building_path, seed]
+
+
+def simulate_combination(job, building_path, seed, state, combination) -> dict:
+    """outcome of the model in state with the upgrades of combination, job may be None
+
+    reports its progress and stops between months once the job is cancelled
+    """
+    model = worker_model(building_path, seed)
+    set_state(model, state)
+    apply_upgrades(model, combination)
+    if job is None:
+        return simulate_outcome(model)
+
+    def cancelled(hour):
+        job.progress = hour / 8760
+        return job.cancelled
+
+    return simulate_outcome(model, cancelled)
+
+
+class UpgradeOutcomes:
+    """Outcomes of every reachable combination of upgrades, simulated in the background
+
+    start() submits a job per missing combination of the available upgrades
+    for the current building and HVAC state to the job system (see jobs.py),
+    the outcomes arrive when the render loop polls it. They are cached by
+    (state, combination), so estimate() answers instantly, or returns None
+    while the combination is still pending. Without a job system start()
+    simulates synchronously.
+    """
+
+    def __init__(self, building_path=Path(DATA_PATH, DEFAULT_PATH_BUILDING), seed=None,
+                 jobs=None):
+        self.building_path = building_path
+        self.seed = seed
+        self.jobs = jobs
+        self.outcomes = {}  # (state key, frozenset of upgrade names) -> outcome
+        self.submitted = {}  # same keys -> Job, until the outcome arrived
+
+    @staticmethod
+    def combinations(upgrades):
+        """every subset of the available upgrades, the empty one first"""
+        available = [u for u in upgrades if u["available"]]
+        for n in range(len(available) + 1):
+            yield from combinations(available, n)
+
+    def start(self, model: EnergyModel, upgrades):
+        """simulates the missing combinations for the state of model in the background"""
+        state = model_state(model)
+        for combination in self.combinations(upgrades):
+            key = (state_key(state), frozenset(u["name"] for u in combination))
+            if key in self.outcomes or key in self.submitted:
+                continue
+            args = (self.building_path, self.seed, state, combination)
+            if self.jobs is None:
+                self.outcomes[key] = simulate_combination(None, *args)
+                continue
+            self.submitted[key] = self.jobs.submit(
+                "upgrade outcome",
+                simulate_combination,
+                *args,
+                on_done=lambda outcome, key=key: self.arrived(key, outcome),
+            )
+
+    def arrived(self, key, outcome):
+        self.submitted.pop(key, None)
+        self.outcomes[key] = outcome
+
+    def precompute(self, model: EnergyModel, upgrades):
+        """like start(), but waits until all outcomes are there"""
+        self.start(model, upgrades)
+        for key, job in list(self.submitted.items()):
+            self.arrived(key, job.result())
+
+    def cancel(self):
+        """cancels the pending combinations, start() submits them again"""
+        for job in self.submitted.values():
+            job.cancel()
+        self.submitted.clear()
+
+    @property
+    def pending(self) -> int:
+        return len(self.submitted)
+
+    def outcome(self, model: EnergyModel, names):
+        """cached outcome of the model with the upgrades called names, None if pending"""
+        return self.outcomes.get((state_key(model_state(model)), frozenset(names)))
+
+    def estimate(self, model: EnergyModel, upgrades):
+        """savings and payback of buying upgrades (dicts) in the current state, None if pending"""
+        base = self.outcome(model, ())
+        upgraded = self.outcome(model, [u["name"] for u in upgrades])
+        if base is None or upgraded is None:
+            return None
+        savings = base["cost"] - upgraded["cost"]
+        cost = sum(u["cost"] for u in upgrades)
+        return {
+            "savings": round(savings),  # €/a
+            "payback": round(cost / savings, 1) if savings > 0 else None,  # years
+            "emissions": round(upgraded["emissions"] - base["emissions"]),  # kg/a
+            "discomfort": round(upgraded["discomfort"] - base["discomfort"]),  # Kh/a
+        }
@@ -0,0 +1,73 @@
+import pygame as pg
+
+_NEVER_RENDERED = object()
+
+
+class Panel:
+    """A cached surface that is only re-rendered when its input data changes"""
+
+    def __init__(self, rect, render, transparent=False):
+        self.rect = pg.Rect(rect)
+        self.render = render  # render(surface, data), in panel coordinates
+        self.transparent = transparent
+        self.surface = pg.Surface(self.rect.size, pg.SRCALPHA if transparent else 0)
+        self.data = _NEVER_RENDERED
+        self.changed = False
+
+    def update(self, data):
+        """re-renders the panel if data differs from the last rendered data"""
+        if data == self.data:
+            return False
+        if self.transparent:
+            self.surface.fill((0, 0, 0, 0))
+        self.render(self.surface, data)
+        self.data = data
+        self.changed = True
+        return True
+
+    def invalidate(self):
+        self.data = _NEVER_RENDERED
+
+
+class PanelLayer:
+    """Retained-mode stack of panels composed onto a target surface
+
+    Only the rectangles of changed panels are recomposed, compose() returns
+    them so they can be passed on to pg.display.update.
+    """
+
+    def __init__(self, target: pg.Surface):
+        self.target = target
+        self.panels = {}  # name -> Panel, composed bottom to top in insertion order
+        self.full_redraw = True
+
+    def panel(self, name, rect, render, transparent=False) -> Panel:
+        """returns the panel called name, created on first use"""
+        if name not in self.panels:
+            self.panels[name] = Panel(rect, render, transparent)
+        return self.panels[name]
+
+    def update(self, name, data):
+        return self.panels[name].update(data)
+
+    def invalidate(self):
+        """recompose everything on the next frame, e.g. after another screen drew onto the target"""
+        self.full_redraw = True
+
+    def compose(self) -> list:
+        if self.full_redraw:
+            dirty = [self.target.get_rect()]
+        else:
+            dirty = [p.rect for p in self.panels.values() if p.changed]
+
+        for rect in dirty:
+            self.target.set_clip(rect)
+            for p in self.panels.values():
+                if p.rect.colliderect(rect):
+                    self.target.blit(p.surface, p.rect)
+        self.target.set_clip(None)
+
+        for p in self.panels.values():
+            p.changed = False
+        self.full_redraw = False
+        return dirty
@@ -1,28 +1,86 @@
-import random
+import numpy as np
 import pygame as pg
 
-class Particle:
-    def __init__(self, pos, speed, lifetime):
-        self.pos = pos
-        self.speed = speed
-        self.lifetime = lifetime
 
-    
+class ParticleGroup:
+    """Particles of one kind, stored as preallocated numpy arrays (struct of arrays)
+
+    Only the first `count` rows are alive. Dead particles are removed by
+    moving live particles from the end into their slots (swap-compaction).
+    """
+
+    def __init__(self, capacity=4096, damping=(1.0, 0.9), spread=30, rng=None):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.speed = np.zeros((capacity, 2))
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+        self.count = 0
+        self.damping = np.array(damping)  # speed factor per update for (x, y)
+        self.spread = spread  # random rotation of the emitted velocity in degrees
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def emit(self, position, velocity, lifetime, n=1):
+        """adds n particles at position, each velocity rotated randomly by +-spread degrees"""
+        n = min(n, self.capacity - self.count)
+        if n <= 0:
+            return
+        new = slice(self.count, self.count + n)
+        angles = np.radians(self.rng.uniform(-self.spread, self.spread, n))
+        cos, sin = np.cos(angles), np.sin(angles)
+        vx, vy = velocity
+        self.pos[new] = position
+        self.speed[new, 0] = vx * cos - vy * sin
+        self.speed[new, 1] = vx * sin + vy * cos
+        self.lifetime[new] = lifetime
+        self.count += n
+
+    def update(self):
+        live = slice(0, self.count)
+        self.lifetime[live] -= 1
+        self.compact()
+        live = slice(0, self.count)
+        self.pos[live] += self.speed[live]
+        self.speed[live] *= self.damping
+
+    def compact(self):
+        """moves live particles from the end into the slots of dead ones"""
+        dead = np.flatnonzero(self.lifetime[: self.count] <= 0)
+        if len(dead) == 0:
+            return
+        new_count = self.count - len(dead)
+        holes = dead[dead < new_count]
+        tail = np.arange(new_count, self.count)
+        movers = tail[self.lifetime[tail] > 0]
+        for array in (self.pos, self.speed, self.lifetime):
+            array[holes] = array[movers]
+        self.count = new_count
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self) -> str:
+        return f"ParticleGroup({self.count}/{self.capacity})"
+
+
 class ParticleManager:
-    def __init__(self):
+    def __init__(self, emission_rate=1, capacity=4096):
+        self.emission_rate = emission_rate  # particles per emit call (i.e. per frame held)
         self.groups = {}
-        self.groups["heating"] = []
-        self.groups["cooling"] = []
-    
-    def add(self, list_name, position, velocity, lifetime):
+        self.groups["heating"] = ParticleGroup(capacity)
+        self.groups["cooling"] = ParticleGroup(capacity)
+
+    def add(self, list_name, position, velocity, lifetime, n=None):
         if list_name not in self.groups:
             raise KeyError(f"{list_name=} not in {__name__}.particleLists")
-        p = Particle(
-            pos=pg.Vector2(position), 
-            speed=pg.Vector2(velocity).rotate(random.randint(-30,30)),
-            lifetime=lifetime
-            )
-        self.groups[list_name].append(p)
+        self.groups[list_name].emit(
+            position, velocity, lifetime, self.emission_rate if n is None else n
+        )
+
+    def set_emission_rate(self, particles_per_emit):
+        self.emission_rate = particles_per_emit
 
     def heat(self, position, velocity):
         self.add("heating", position, velocity, lifetime=50)
@@ -31,30 +89,28 @@ class ParticleManager:
         self.add("cooling", position, velocity, lifetime=50)
 
     def update(self):
-        for name, container in self.groups.items():
-            for i, p in sorted(enumerate(container), reverse=True):
-                p.lifetime -= 1
-                if p.lifetime <= 0: 
-                    container.pop(i)
-                    continue
-                #p.speed.scale_to_length(p.lifetime/50)
-                p.pos += p.speed
-                vx, vy = p.speed
-                p.speed = (vx, vy*0.9)
-
-
-def test_draw_particles(container, screen):
+        for group in self.groups.values():
+            group.update()
+
+    def clear(self):
+        for group in self.groups.values():
+            group.clear()
+
+
+def test_draw_particles(group, screen):
     """Draw all particles on the screen."""
-    for p in container:
-        pg.draw.circle(screen, (255, 100, 100), (int(p.pos.x), int(p.pos.y)), 3)
+    for x, y in group.pos[: group.count].astype(int).tolist():
+        pg.draw.circle(screen, (255, 100, 100), (x, y), 3)
 
 
 if __name__ == "__main__":
+    import random
+
     pg.init()
     screen = pg.display.set_mode((400, 400))
     clock = pg.time.Clock()
 
-    pmanager = ParticleManager()
+    pmanager = ParticleManager(emission_rate=5)
 
     running = True
     while running:
@@ -77,4 +133,4 @@ if __name__ == "__main__":
         pg.display.flip()  # Update the display
         clock.tick(60)  # Run at 60 FPS
 
-    pg.quit()
\ No newline at end of file
+    pg.quit()
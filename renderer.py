@@ -3,10 +3,20 @@ import pygame as pg
 import math
 from pathlib import Path
 
+import numpy as np
+
+from assets import AssetManager
+from cache import LRUCache
 from camera import Camera2D
 from font import Font
 from handler import Button  # necessary?
-from utils import color_interpolation, seasonalcolor, circle_surf, change_color
+from panels import PanelLayer
+from utils import (
+    color_interpolation,
+    color_interpolations,
+    seasonalcolors,
+    circle_surf,
+)
 
 ROOT_PATH = Path(__file__).parent
 sys.path.append(ROOT_PATH)
@@ -53,6 +63,78 @@ def color_indicator(dT):
         return GREEN
 
 
+class HourTables:
+    """Colors of every hour of the year (and every displayed comfort score), computed once
+
+    The renderers look colors up by hour instead of interpolating them every
+    frame. Colors are stored as uint8, the same values fill() and the fonts
+    use after truncating the interpolated floats.
+    """
+
+    hours = 8760
+    score_steps = 10  # comfort scores are shown with one decimal
+
+    def __init__(self):
+        season = seasonalcolors(self.hours)
+        self.season = season.astype(np.uint8)
+        # outdoor temperature label, see CurvesRenderer.draw_TA_indicator
+        self.TA_text = color_interpolations(season, BLACK, 0.5).astype(np.uint8)
+        self.TA_border = color_interpolations(season, WHITE, 0.8).astype(np.uint8)
+        # comfort score text: color_indicator(dT) towards green with the score
+        weights = np.arange(100 * self.score_steps + 1) / self.score_steps / 100
+        self.comfort = np.stack(
+            [color_interpolations(c, GREEN, weights) for c in (BLUE, GREEN, RED)]
+        ).astype(np.uint8)
+
+    def season_color(self, hour) -> tuple:
+        return tuple(self.season[int(hour) % self.hours].tolist())
+
+    def TA_colors(self, hour) -> tuple:
+        """(text color, border color) of the outdoor temperature label"""
+        h = int(hour) % self.hours
+        return tuple(self.TA_text[h].tolist()), tuple(self.TA_border[h].tolist())
+
+    def comfort_color(self, score, dT) -> tuple:
+        sign = int(dT > 0) - int(dT < 0)
+        step = min(max(round(score * self.score_steps), 0), 100 * self.score_steps)
+        return tuple(self.comfort[sign + 1, step].tolist())
+
+
+class GlowAtlas:
+    """Pre-rendered particle sprites for every (color, lifetime)
+
+    A particle of lifetime l is drawn as a core circle of radius l/8 and
+    an additive glow of radius l/3, both sprites are rendered once here.
+    """
+
+    def __init__(self, colors, max_lifetime=50, glow_weight=0.2):
+        self.max_lifetime = max_lifetime
+        lifetimes = np.arange(max_lifetime + 1)
+        self.core_radius = lifetimes / 8
+        self.glow_radius = lifetimes / 3
+        self.sprites = {}
+        for color in colors:
+            glow_color = color_interpolation((0, 0, 0), color, glow_weight)
+            self.sprites[tuple(color)] = (
+                [circle_surf(r, color) for r in self.core_radius],
+                [circle_surf(r, glow_color) for r in self.glow_radius],
+            )
+
+    def blit_sequences(self, color, positions, lifetimes):
+        """returns the (core, glow) sequences for Surface.blits"""
+        cores, glows = self.sprites[tuple(color)]
+        lifetimes = np.clip(lifetimes, 0, self.max_lifetime)
+        core_dest = (positions - self.core_radius[lifetimes, None]).tolist()
+        glow_dest = (positions - self.glow_radius[lifetimes, None]).tolist()
+        lifetimes = lifetimes.tolist()
+        core_seq = [(cores[l], dest) for l, dest in zip(lifetimes, core_dest)]
+        glow_seq = [
+            (glows[l], dest, None, pg.BLEND_RGB_ADD)
+            for l, dest in zip(lifetimes, glow_dest)
+        ]
+        return core_seq, glow_seq
+
+
 class Renderer:
     def __init__(
         self, display: pg.Surface, camera: Camera2D, clock: pg.time.Clock, scale=1.0
@@ -63,10 +145,29 @@ class Renderer:
         self.clock = clock
         self.scale = scale
 
+        # images are read from disk once, converted and scaled variants are cached
+        self.assets = AssetManager(IMAGE_PATH)
+        self.assets.preload()
+
         # defaults
         self.lineheight = 25
         self.font = Font(FONT_PATH / "small_font.png")
         self.titlefont = Font(FONT_PATH / "large_font.png")
+        # finished, outlined text surfaces: unchanged text costs a single blit
+        self.text_cache = LRUCache(maxsize=512)
+        # pre-composited outline sprites, keyed by what the source surface shows
+        self.outline_cache = LRUCache(maxsize=64)
+        self.button_cache = LRUCache(maxsize=64)
+        self.glow_atlas = GlowAtlas((colors["QH"], colors["QC"]))
+        # hour-indexed colors, the same for every year
+        self.tables = HourTables()
+        # retained-mode static screens (menu, popups), see render_screen
+        self.layers = {}
+
+        # quality settings, lowered by the FrameBudget when frames run over budget
+        self.particle_fraction = 1.0  # share of the particles that is drawn
+        self.lod_bias = 0  # extra curve pyramid levels
+        self.outlines = True  # outlines around text and the house indicator
 
         # components
         self.ui_renderer = UIRenderer(self)
@@ -99,6 +200,44 @@ class Renderer:
         onto.blit(mask_surf, (x + pixel, y - pixel))
         onto.blit(mask_surf, (x - pixel, y + pixel))
 
+    def composite_outline(self, surf, pixel, color=(10, 10, 10)):
+        """returns a new surface with surf on top of its outline, padded by pixel on each side"""
+        w, h = surf.get_size()
+        composite = pg.Surface((w + 2 * pixel, h + 2 * pixel), pg.SRCALPHA)
+        self.outline(surf, (pixel, pixel), pixel, color, onto=composite)
+        composite.blit(surf, (pixel, pixel))
+        return composite
+
+    def outlined(self, surf, key, pixel, color=(10, 10, 10)):
+        """cached composite_outline of surf
+
+        key names what surf shows (e.g. the asset name and size), surfaces
+        that are drawn onto need a new key for every new content.
+        """
+        return self.outline_cache.get(
+            (key, pixel, tuple(color)), lambda: self.composite_outline(surf, pixel, color)
+        )
+
+    def blit_outlined(self, surf, key, loc, pixel, color=(10, 10, 10), onto=None):
+        """blits surf with its outline at loc, like outline() followed by a blit of surf"""
+        if not onto:
+            onto = self.display
+        if not self.outlines:
+            onto.blit(surf, loc)
+            return
+        x, y = loc
+        onto.blit(self.outlined(surf, key, pixel, color), (x - pixel, y - pixel))
+
+    def text_surface(self, text, font, size, color, border_width, border_color):
+        """cached surface of an outlined text line"""
+        key = (text, font, size, tuple(color), border_width, tuple(border_color))
+        return self.text_cache.get(
+            key,
+            lambda: self.composite_outline(
+                font.surface(text, size, color), border_width, border_color
+            ),
+        )
+
     def render_line(
         self,
         text: str,
@@ -115,10 +254,11 @@ class Renderer:
             font = self.font
         if not onto:
             onto = self.display
+        if not self.outlines:
+            border_width = 0
         px, py = pos
-        textsurf = font.surface(text, size, color)
-        self.outline(textsurf, (px, py), border_width, border_color, onto=onto)
-        font.render(onto, text, (px, py), size, color)
+        textsurf = self.text_surface(text, font, size, color, border_width, border_color)
+        onto.blit(textsurf, (px - border_width, py - border_width))
 
     def render_lines(
         self,
@@ -143,15 +283,13 @@ class Renderer:
             pg.draw.line(self.display, color, (0, y), (self.display.get_width(), y))
 
     # button
-    def render_button(self, button: Button):
+    def button_surface(self, button: Button):
+        """outlined button sprite, rendered once per text, size and state"""
+        pixel = 1 + button.hovered - button.pressed
         button_surf = pg.Surface(button.size)
         button_surf.fill(
             colors["Button hovered"] if button.hovered else colors["Button"]
         )
-        # outline
-        self.outline(
-            button_surf, button.position, pixel=1 + button.hovered - button.pressed
-        )
         # text
         offset = 5 + 2 * button.pressed
         self.render_line(
@@ -161,37 +299,87 @@ class Renderer:
             size=20,
             border_width=1 + button.hovered,
         )
-        # button
-        self.display.blit(button_surf, button.position)
+        # outline
+        return self.composite_outline(button_surf, pixel)
+
+    def button_sprite(self, button: Button):
+        """returns the cached button sprite and its outline width"""
+        key = (button.text, button.size, button.hovered, button.pressed, self.outlines)
+        surf = self.button_cache.get(key, lambda: self.button_surface(button))
+        return surf, 1 + button.hovered - button.pressed
+
+    def render_button(self, button: Button, onto=None, offset=(0, 0)):
+        if not onto:
+            onto = self.display
+        surf, pixel = self.button_sprite(button)
+        x, y = button.position
+        dx, dy = offset
+        onto.blit(surf, (x - pixel + dx, y - pixel + dy))
+
+    # retained-mode screens
+    def render_screen(self, name, render, data, buttons=()):
+        """Retained-mode frame of a static screen with buttons on top
+
+        render(data) draws the screen onto the display and is only called when
+        data changed, buttons are redrawn when their state changed.
+        Returns the dirty rectangles for pg.display.update.
+        """
+        if name not in self.layers:
+            self.layers[name] = PanelLayer(self.display)
+        layer = self.layers[name]
+
+        def render_static(surface, data):
+            render(data)
+            surface.blit(self.display, (0, 0))
+
+        layer.panel(name, self.display.get_rect(), render_static)
+        layer.update(name, data)
+
+        border = 2  # widest button outline
+        for button in buttons:
+            rect = pg.Rect(button.position, button.size).inflate(2 * border, 2 * border)
+            offset = (-rect.x, -rect.y)
+            layer.panel(
+                (name, id(button)),
+                rect,
+                lambda surface, state, button=button, offset=offset: self.render_button(
+                    button, onto=surface, offset=offset
+                ),
+                transparent=True,
+            )
+            layer.update((name, id(button)), (button.text, button.hovered, button.pressed))
+        return layer.compose()
+
+    def invalidate_screens(self):
+        """the display was drawn on by someone else, recompose screens fully next time"""
+        for layer in self.layers.values():
+            layer.invalidate()
 
     # main game loop
     def draw_background(self, hour_of_year):
         # self.display.fill((0,0,0))
-        self.display.fill(seasonalcolor(hour_of_year))
+        self.display.fill(self.tables.season_color(hour_of_year))
 
     # draw stuff using camera (game)
     def render_curves(self, curve_data):
         self.curves_renderer.render(curve_data)
 
     # particle renderer
-    def draw_particles(self, particleList, color):
-        for p in particleList:
-            pos = self.camera.screen_coords(p.pos)
-            x, y = pos
-            pg.draw.circle(self.display, color, pos, p.lifetime / 8)
-            glow_color = color_interpolation((0, 0, 0), color, 0.2)
-            radius = p.lifetime / 3
-            self.display.blit(
-                circle_surf(radius, glow_color),
-                (x - radius, y - radius),
-                special_flags=pg.BLEND_RGB_ADD,
-            )
+    def draw_particles(self, group, color):
+        count = int(group.count * self.particle_fraction)
+        if not count:
+            return
+        positions = self.camera.screen_coords_array(group.pos[:count])
+        lifetimes = group.lifetime[:count]
+        cores, glows = self.glow_atlas.blit_sequences(color, positions, lifetimes)
+        self.display.blits(cores, doreturn=False)
+        self.display.blits(glows, doreturn=False)
 
-    def draw_heat_particles(self, particleList):
-        self.draw_particles(particleList, colors["QH"])
+    def draw_heat_particles(self, group):
+        self.draw_particles(group, colors["QH"])
 
-    def draw_cool_particles(self, particleList):
-        self.draw_particles(particleList, colors["QC"])
+    def draw_cool_particles(self, group):
+        self.draw_particles(group, colors["QC"])
 
     # main game UI
     def render_ui(self, ui_data):
@@ -250,8 +438,9 @@ class MenuRenderer:
         self.stats_text_color = ALMOSTBLACK
 
         # Load the background image for the upgrade menu
-        bg_image = pg.image.load(IMAGE_PATH / "bg_house.png").convert()
-        self.menu_background = pg.transform.scale(bg_image, self.display.get_size())
+        self.menu_background = renderer.assets.image(
+            "bg_house.png", size=self.display.get_size(), alpha=False
+        )
 
     def render(self, data):
         """Render the upgrade menu including background, tiles, and costs."""
@@ -271,6 +460,13 @@ class MenuRenderer:
         # Render upgrade tiles and costs
         self.render_upgrade_tiles(data["upgrades"], pos=(600, 100))
         self.render_player_stats(data["player"], pos=(600, 50))
+        if data.get("previews pending"):
+            self.render_line(
+                "Simulating...",
+                pos=(600, 440),
+                color=colors["Price"],
+                size=20,
+            )
 
         self.render_title(self.topleft)
 
@@ -300,8 +496,7 @@ class MenuRenderer:
         tile_surf = pg.Surface(self.tile_size)
 
         # Render the tile image
-        tile_image = pg.image.load(IMAGE_PATH / upgrade["image"]).convert_alpha()
-        tile_image = pg.transform.scale(tile_image, size=self.tile_size)
+        tile_image = self.renderer.assets.image(upgrade["image"], size=self.tile_size)
 
         if not upgrade["available"]:
             grey_surf = pg.Surface(self.tile_size)
@@ -326,10 +521,33 @@ class MenuRenderer:
             size=20,
             onto=tile_surf,
         )
+        self.render_upgrade_outcome(upgrade, tile_surf)
 
         # Blit the tile to the display
         self.display.blit(tile_surf, pos)
 
+    def render_upgrade_outcome(self, upgrade: dict, tile_surf):
+        """savings per year and payback time of an upgrade, "..." while they are simulated"""
+        if "outcome" not in upgrade:
+            return
+        outcome = upgrade["outcome"]
+        if outcome is None:
+            lines = ["..."]
+        else:
+            payback = outcome["payback"]
+            lines = [
+                f"{outcome['savings']:+}€/a",
+                f"{payback:.0f} a" if payback is not None else "-",
+            ]
+        for i, line in enumerate(lines):
+            self.render_line(
+                line,
+                pos=(10, 65 + 17 * i),
+                color=colors["Price"],
+                size=20,
+                onto=tile_surf,
+            )
+
     def render_player_stats(self, player_data, pos):
         """Render player stats such as available money."""
         self.render_line(
@@ -359,9 +577,9 @@ class CurvesRenderer:
         self.size_TI_indicator = 10
 
         # Load the house image for the indicator
-        house = pg.image.load(IMAGE_PATH / "glide.png").convert()
-        house.set_colorkey((255, 255, 0))
-        self.house = pg.transform.scale(house, (40, 40))
+        self.house = renderer.assets.image(
+            "glide.png", size=(40, 40), alpha=False, colorkey=(255, 255, 0)
+        )
 
     def render(self, data):
         self.draw_curve("orange", data["Maximum Comfort Temperature"])
@@ -373,11 +591,28 @@ class CurvesRenderer:
         self.draw_TA_indicator(data["TA Indicator"])
 
     # curve renderer
-    def draw_curve(self, color, curve):
-        """Draw curves representing game data."""
-        if len(curve) < 2:
+    def lod_level(self, vertices_per_column=1):
+        """pyramid level with at most vertices_per_column vertices per pixel column
+
+        a level k block of 2**k hours is drawn as a (min, max) vertex pair
+        """
+        hours_per_pixel = 1 / self.renderer.camera.zoom_level[0]
+        level = max(0, math.ceil(math.log2(2 * hours_per_pixel / vertices_per_column)))
+        return level + self.renderer.lod_bias
+
+    def draw_curve(self, color, curve_span):
+        """Draw curves representing game data, culled to the camera view."""
+        curve, start, end = curve_span
+        xmin, xmax, _, _ = self.renderer.camera.view_bounds
+        # keep one point beyond each edge, so the lines reach the border
+        start = max(start, math.floor(xmin) - 1)
+        end = min(end, math.ceil(xmax) + 2)
+        if end - start < 2:
             return
-        screencoords = [self.screen_coords(point) for point in curve]  # Only last 300 points
+        xs, ys = curve.lod_window(start, end, self.lod_level())
+        if len(xs) < 2:
+            return
+        screencoords = self.renderer.camera.project_xy(xs, ys).tolist()
         pg.draw.lines(
             self.renderer.display,
             color,
@@ -393,8 +628,7 @@ class CurvesRenderer:
         size = self.size_TI_indicator * data["Scale"]
         pg.draw.circle(self.renderer.display, color, (x, y), size)
 
-        self.renderer.outline(self.house, (x - 15, y - 15), 2)
-        self.renderer.display.blit(self.house, (x - 15, y - 15))
+        self.renderer.blit_outlined(self.house, ("glide.png", (40, 40)), (x - 15, y - 15), 2)
 
     def draw_indicator(self, gamepos1, gamepos2, color):
         screenpos1 = self.screen_coords(gamepos1)
@@ -404,9 +638,7 @@ class CurvesRenderer:
     def draw_TA_indicator(self, data):
         hour, TA = data["TA"]
         TA_pos = self.screen_coords((hour, TA))
-        textcolor = seasonalcolor(hour)
-        bordercolor = color_interpolation(textcolor, (255, 255, 255), 0.8)
-        textcolor = color_interpolation(textcolor, (0, 0, 0), 0.5)
+        textcolor, bordercolor = self.renderer.tables.TA_colors(hour)
         self.draw_indicator((hour, TA), data["TI"], "blue")
         text = f"Outdoor Temp {TA:+2.1f}°C"
         self.renderer.render_line(
@@ -515,20 +747,18 @@ class UIRenderer:
 
     def render_comfort_score(self, score, dT, pos=(550, 50)):
         text = f"Comfort {score:.1f} %"
-        color = color_indicator(dT)
-        color = color_interpolation(color, GREEN, score / 100)
+        color = self.renderer.tables.comfort_color(score, dT)
         self.render_line(text, color, pos=pos, size=30)
 
 
 # test code
 def test():
     import pygame as pg
-    from pygame.math import Vector2  # For handling positions
     import random
     from camera import Camera2D  # Assuming you have a simple Camera2D implementation
     from font import Font  # Your Font class for text rendering
     from renderer import Renderer  # The Renderer class
-    from particles import Particle
+    from particles import ParticleGroup
 
     # A basic mock for UI, simulating the data that UI would pass to the Renderer
     mock_ui_data = {
@@ -550,24 +780,16 @@ def test():
     camera = Camera2D(screen, zoom=(1, 1))
     renderer = Renderer(screen, camera, clock)
 
-    # Mock particle lists for heat and cool particles
-    heat_particles = [
-        Particle(
-            Vector2(random.randint(100, 700), random.randint(100, 500)),
-            Vector2(random.uniform(-1, 1), random.uniform(-1, 1)),
-            50,
-        )
-        for _ in range(10)
-    ]
-
-    cool_particles = [
-        Particle(
-            Vector2(random.randint(100, 700), random.randint(100, 500)),
-            Vector2(random.uniform(-1, 1), random.uniform(-1, 1)),
-            50,
-        )
-        for _ in range(10)
-    ]
+    # Mock particle groups for heat and cool particles
+    heat_particles = ParticleGroup()
+    cool_particles = ParticleGroup()
+    for group in (heat_particles, cool_particles):
+        for _ in range(10):
+            group.emit(
+                (random.randint(100, 700), random.randint(100, 500)),
+                (random.uniform(-1, 1), random.uniform(-1, 1)),
+                50,
+            )
 
     running = True
     while running:
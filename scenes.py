@@ -0,0 +1,74 @@
+import pygame as pg
+
+from handler import InputHandler
+
+
+class Scene:
+    """A screen of the game (menu, year, popup) with its own input handler
+
+    enter() and exit() are called by the SceneManager when the scene becomes
+    active or inactive, they set up and free whatever the scene holds on to.
+    frame() renders one frame after the input has been handled.
+    """
+
+    def __init__(self, input_handler: InputHandler):
+        self.input_handler = input_handler
+
+    def enter(self):
+        pass
+
+    def exit(self):
+        pass
+
+    def frame(self):
+        raise NotImplementedError
+
+
+class SceneManager:
+    """Flat main loop that runs the active scene and swaps scenes between frames
+
+    Callbacks only request a switch, the manager applies it at the start of the
+    next frame, so going back and forth between scenes never nests loops and
+    the stack depth stays the same during arbitrarily long sessions.
+    Finished background jobs (see jobs.py) are polled once per frame.
+    """
+
+    def __init__(self, clock: pg.time.Clock, fps=60, jobs=None):
+        self.clock = clock
+        self.fps = fps
+        self.jobs = jobs
+        self.current = None
+        self.next = None
+        self.running = False
+
+    def switch(self, scene: Scene):
+        """makes scene the active scene from the next frame on"""
+        self.next = scene
+
+    def quit(self):
+        self.running = False
+
+    def _apply_switch(self):
+        if self.current is not None:
+            self.current.exit()
+        self.current, self.next = self.next, None
+        self.current.enter()
+
+    def run(self, scene: Scene):
+        """runs scenes starting with scene until quit() or the window is closed"""
+        self.switch(scene)
+        self.running = True
+        while self.running:
+            if self.next is not None:
+                self._apply_switch()
+            if not self.current.input_handler.update():
+                self.quit()
+            if not self.running or self.next is not None:
+                continue
+            if self.jobs is not None:
+                self.jobs.poll()
+            self.current.frame()
+            self.clock.tick(self.fps)
+        if self.current is not None:
+            self.current.exit()
+            self.current = None
@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from model.GameModel import GameModel
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable state of the game after a simulated hour, as published for rendering"""
+
+    hour: int
+    TI: float
+    qh: float
+    qc: float
+    money: float
+    curves: dict
+    ui: dict
+    time: float  # perf_counter() when published
+
+    @property
+    def position(self):
+        return (self.hour, self.TI)
+
+    @classmethod
+    def of(cls, game: GameModel):
+        curves = game.get_curves_data()
+        for name, data in curves.items():
+            if isinstance(data, tuple):  # copy the span, the worker keeps writing the curve
+                curve, start, end = data
+                curves[name] = (curve.span(start, end), start, end)
+        return cls(
+            hour=game.hour,
+            TI=float(game.TI),
+            qh=float(game.qh),
+            qc=float(game.qc),
+            money=game.money,
+            curves=curves,
+            ui=game.get_ui_data(),
+            time=time.perf_counter(),
+        )
+
+
+class SimulationScheduler:
+    """Runs GameModel.update on a worker thread at game.speed simulated hours per second
+
+    The simulation advances in fixed one-hour steps, independent of the frame
+    rate, and catches up (at most max_catchup hours at once) when it falls behind.
+    After each batch it publishes a (previous, current) pair of snapshots by
+    swapping a single reference, so the render thread never waits for a lock
+    and interpolates between the two.
+
+    While running, the worker owns the GameModel: player input goes through
+    heat()/cool() and commit_input() instead of the GameModel flags, other
+    changes through request(), which runs them on the worker between batches.
+    Snapshots hold copies of the curves, never the GameModel's own arrays.
+    """
+
+    def __init__(self, game: GameModel, max_catchup=48, min_sleep=1 / 240):
+        self.game = game
+        self.max_catchup = max_catchup
+        self.min_sleep = min_sleep
+        self.thread = None
+        self.running = False
+        self.input = (False, False)  # (heat, cool) held until the next commit_input()
+        self._pending = [False, False]
+        self.accumulated_hours = 0.0
+        self.year_finished = False
+        self.out_of_money = False
+        self.skip_requested = False
+        self.requests = deque()  # actions for the worker, see request()
+        self._published = None
+
+    # control (render thread)
+    def start(self):
+        self.stop()
+        self.year_finished = False
+        self.out_of_money = False
+        self.accumulated_hours = 0.0
+        self.skip_requested = False
+        self.requests.clear()
+        snapshot = Snapshot.of(self.game)
+        self._published = (snapshot, snapshot)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def heat(self):
+        self._pending[0] = True
+
+    def cool(self):
+        self._pending[1] = True
+
+    def skip_to_next_day(self):
+        """fast forwards to the next midnight with the current input"""
+        self.skip_requested = True
+
+    def request(self, action):
+        """runs action() on the worker before its next batch, also while paused"""
+        self.requests.append(action)
+
+    def toggle_pause(self):
+        self.request(self.game.toggle_pause)
+
+    def increment_cop(self, cop_change):
+        self.request(lambda: self.game.increment_cop(cop_change))
+
+    def toggle_autopilot(self):
+        self.request(self.game.toggle_autopilot)
+
+    def set_speed(self, simhours_per_second):
+        self.request(lambda: self.game.set_speed(simhours_per_second))
+
+    def commit_input(self):
+        """hands this frame's input to the simulation, it holds until the next commit"""
+        self.input = tuple(self._pending)
+        self._pending = [False, False]
+
+    # published state (render thread)
+    @property
+    def snapshot(self) -> Snapshot:
+        return self._published[1]
+
+    def alpha(self, now=None):
+        """progress [0, 1] from the previous towards the current snapshot"""
+        previous, current = self._published
+        interval = current.time - previous.time
+        if interval <= 0:
+            return 1.0
+        now = time.perf_counter() if now is None else now
+        return min(max((now - current.time) / interval, 0.0), 1.0)
+
+    @property
+    def position(self):
+        """game position interpolated between the last two snapshots"""
+        previous, current = self._published
+        a = self.alpha()
+        return (
+            previous.hour + (current.hour - previous.hour) * a,
+            previous.TI + (current.TI - previous.TI) * a,
+        )
+
+    def curves_data(self):
+        """curve data of the current snapshot with interpolated indicator positions"""
+        curves = dict(self.snapshot.curves)
+        position = self.position
+        curves["TI Indicator"] = {**curves["TI Indicator"], "Position": position}
+        curves["TA Indicator"] = {**curves["TA Indicator"], "TI": position}
+        return curves
+
+    # worker thread
+    def run(self):
+        game = self.game
+        last = time.perf_counter()
+        while self.running:
+            while self.requests:
+                self.requests.popleft()()
+            now = time.perf_counter()
+            if game.paused or self.year_finished or self.out_of_money:
+                last = now
+                time.sleep(1 / 60)
+                continue
+
+            self.accumulated_hours += (now - last) * game.speed
+            last = now
+            hours = min(int(self.accumulated_hours), self.max_catchup)
+            # drop what can't be caught up, the game slows down instead
+            self.accumulated_hours = min(self.accumulated_hours - hours, self.max_catchup)
+            if self.skip_requested:
+                self.skip_requested = False
+                hours = max(hours, game.hours_to_next_day())
+            remaining = game.final_hour_of_the_year - 1 - game.hour
+            if hours >= remaining:
+                hours = max(remaining, 0)
+                self.year_finished = True
+            if hours:
+                game.heat_on, game.cool_on = self.input
+                game.update(hours=hours)
+                self._published = (self._published[1], Snapshot.of(game))
+                if game.money <= 0:
+                    self.out_of_money = True
+
+            # sleep until the next hour is due
+            wait = (1 - self.accumulated_hours % 1) / max(game.speed, 1)
+            time.sleep(min(max(wait, self.min_sleep), 1 / 60))
+
+    @property
+    def lag(self):
+        """simulated hours the worker is behind real time, at most max_catchup"""
+        return self.accumulated_hours
@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame as pg
+
+from assets import AssetManager
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pg.init()
+    pg.display.set_mode((1, 1))
+    yield
+    pg.quit()
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    """a 4x2 sheet with a red and a blue 2x2 sprite"""
+    surf = pg.Surface((4, 2))
+    surf.fill((255, 0, 0), (0, 0, 2, 2))
+    surf.fill((0, 0, 255), (2, 0, 2, 2))
+    pg.image.save(surf, str(tmp_path / "sheet.png"))
+    with open(tmp_path / "sheet.json", "w", encoding="utf-8") as f:
+        json.dump({"sprites": {"red": [0, 0, 2, 2], "blue": [2, 0, 2, 2]}}, f)
+    return tmp_path
+
+
+def test_load_atlas_returns_named_subsurfaces_of_the_cached_sheet(sheet):
+    assets = AssetManager(sheet)
+    sprites = assets.load_atlas("sheet.png", "sheet.json", alpha=False)
+    assert set(sprites) == {"red", "blue"}
+    assert sprites["blue"].get_size() == (2, 2)
+    assert sprites["blue"].get_at((0, 0))[:3] == (0, 0, 255)
+    assert sprites["red"].get_parent() is assets.image("sheet.png", alpha=False)
+    assert assets.load_atlas("sheet.png", "sheet.json", alpha=False) is sprites
+
+
+def test_font_glyphs_come_from_the_atlas(tmp_path):
+    from font import Font
+
+    shutil.copy("assets/fonts/small_font.png", tmp_path)
+    font = Font(tmp_path / "small_font.png")
+    assert (tmp_path / "small_font.glyphs.json").exists()
+    assert font.characters["A"].get_parent() is font.atlas
+    assert font.surface("Hallo").get_width() > 0
+    # the second font reads the manifest instead of scanning the image
+    assert Font(tmp_path / "small_font.png").characters.keys() == font.characters.keys()
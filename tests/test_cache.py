@@ -0,0 +1,39 @@
+from cache import LRUCache
+
+
+def test_hits_and_misses_are_counted():
+    cache = LRUCache(maxsize=2)
+    builds = []
+    build = lambda key: lambda: builds.append(key) or key.upper()
+    assert cache.get("a", build("a")) == "A"
+    assert cache.get("a", build("a")) == "A"
+    assert builds == ["a"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 1)  # b is now the oldest
+    cache.get("c", lambda: 3)
+    assert len(cache) == 2
+    assert "b" not in cache.items and "a" in cache.items
+
+
+
+def test_clear_keeps_the_counts():
+    cache = LRUCache()
+    cache.get("a", lambda: 1)
+    cache.clear()
+    assert len(cache) == 0 and cache.misses == 1
+
+
+def test_discard_drops_one_entry():
+    cache = LRUCache()
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.discard("a")
+    cache.discard("missing")
+    assert list(cache.items) == ["b"]
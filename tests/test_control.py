@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from model.control import cheap_hours
+
+
+def test_cheap_hours_skips_flat_periods():
+    signal = np.r_[np.arange(24.0), np.full(24, 5.0)]
+    mask = cheap_hours(signal, fraction=0.25)
+    assert mask[:24].sum() == 6 and mask[:6].all()
+    assert not mask[24:].any()
+
+
+def test_cheap_hours_rejects_a_signal_flat_in_every_period():
+    signal = np.r_[np.full(24, 1.0), np.full(24, 2.0)]
+    with pytest.raises(ValueError):
+        cheap_hours(signal)
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+import pytest
+
+from model.GameModel import Curve, GameModel
+
+
+def update_hourly(game: GameModel, hours: int):
+    """reference path of GameModel.update(), one model timestep per hour"""
+    for _ in range(hours):
+        game._mh = game.hour % 8760
+        if game._mh == game.final_hour_of_the_year:
+            return
+
+        game.model.timestep(hour=game._mh)
+        if game.heat_on:
+            game.model.apply_heat(game._mh)
+        if game.cool_on:
+            game.model.apply_cool(game._mh)
+        game.model.calc_ED(game._mh)
+        game.money -= game.model.ED[game._mh] * game.model.price_grid
+        game.model.comfort_score_tsd[game._mh] = game.model.comfort.comfort_score(game.model.TI[game._mh])
+
+        game.curve_TI.update((game.hour, game.TI))
+        game.hour += 1
+
+
+@pytest.mark.parametrize("start_hour", [100, 8700])
+def test_update_matches_update_hourly(start_hour):
+    fast, hourly = GameModel(), GameModel()
+    for game in (fast, hourly):
+        game.setup_sim(start_hour=start_hour, final_hour=8759)
+    rng = random.Random(0)
+    for _ in range(100):
+        hours = rng.randint(1, 40)
+        heat, cool = rng.random() < 0.4, rng.random() < 0.2
+        for game in (fast, hourly):
+            game.heat_on, game.cool_on = heat, cool
+        fast.update(hours)
+        update_hourly(hourly, hours)
+        assert (fast.hour, fast._mh) == (hourly.hour, hourly._mh)
+        assert fast.money == hourly.money
+
+    for name in ("TI", "QH", "QC", "ED", "comfort_score_tsd"):
+        assert np.array_equal(getattr(fast.model, name), getattr(hourly.model, name)), name
+    assert np.array_equal(fast.curve_TI.y, hourly.curve_TI.y)
+
+
+def test_curve_span_is_an_independent_copy_of_the_window():
+    curve = Curve("x", np.random.default_rng(0).normal(size=8760))
+    span = curve.span(7928, 8072)
+    for level in range(7):
+        for start, end in [(7928, 8072), (7933, 8069)]:
+            xs, ys = curve.lod_window(start, end, level)
+            span_xs, span_ys = span.lod_window(start, end, level)
+            assert np.array_equal(xs, span_xs) and np.array_equal(ys, span_ys)
+    before = span.y.copy()
+    curve.update_range(7950, np.zeros(10))
+    assert np.array_equal(span.y, before)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from model.mpc import BLOCKS, HEAT, ROWS, MPCController, shift, solve_lp
+
+INF = np.inf
+
+
+def test_solve_lp_finds_the_optimum():
+    # max x1 + 2 x2 with 0 <= x1, x2 <= 1 and x1 + x2 <= 1.5
+    c = np.array([-1.0, -2.0])
+    A = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    lower, upper = np.array([0.0, 0.0, -INF]), np.array([1.0, 1.0, 1.5])
+    x, y, iterations, converged = solve_lp(c, A, lower, upper)
+    assert converged
+    np.testing.assert_allclose(x, [0.5, 1.0], atol=1e-5)
+    assert y[2] > 0  # the active upper bound of the sum
+    assert abs(y[0]) < 1e-5  # x1 is between its bounds
+
+
+def test_solve_lp_with_equality_rows():
+    # min x1 + 2 x2 with x1 + x2 == 1, 0 <= x <= 1
+    c = np.array([1.0, 2.0])
+    A = np.array([[1.0, 1.0], [1.0, 0.0], [0.0, 1.0]])
+    lower, upper = np.array([1.0, 0.0, 0.0]), np.array([1.0, 1.0, 1.0])
+    x, _, _, converged = solve_lp(c, A, lower, upper)
+    assert converged
+    np.testing.assert_allclose(x, [1.0, 0.0], atol=1e-5)
+
+
+def test_warm_start_from_the_last_hour_needs_fewer_iterations():
+    from model.Simulation import EnergyModel
+
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    model.simulate()
+    controller = MPCController(horizon=12)
+    controller.prepare(model)
+    t = 100
+    x, y, _, _ = solve_lp(*controller.problem(model, t), max_iter=100)
+    c, A, lower, upper = controller.problem(model, t + 1)
+    cold = solve_lp(c, A, lower, upper, max_iter=100)
+    warm = solve_lp(c, A, lower, upper, warm=(shift(x, len(BLOCKS)), shift(y, ROWS)), max_iter=100)
+    assert cold[3] and warm[3]
+    assert c @ warm[0] == pytest.approx(c @ cold[0], rel=1e-5, abs=1e-6)
+    assert warm[2] < cold[2]
+
+
+def test_deadline_stops_early():
+    c = np.array([-1.0, -2.0])
+    A = np.eye(2)
+    x, _, iterations, converged = solve_lp(c, A, np.zeros(2), np.ones(2), deadline=0.0)
+    assert not converged and iterations == 1
+
+
+def test_deadline_hit_falls_back_to_the_last_plan_then_the_thermostat():
+    from model.Simulation import EnergyModel
+
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    model.simulate()
+    controller = MPCController(horizon=4, max_iter=100, time_budget=1.0)
+    controller.prepare(model)
+    t = 100  # heating season
+    controller.decide(model, t)
+    planned = controller.last_plan
+
+    controller.max_iter = 1  # one step is not enough, the solve stops unconverged
+    x, converged = controller.plan(model, t + 1)
+    assert not converged
+    heat, _ = controller.decide(model, t + 1)
+    assert heat == pytest.approx(planned[HEAT * 4 + 1])
+    assert heat != pytest.approx(x[HEAT * 4])
+
+    controller.time_budget = 0.0  # every solve stops at its deadline from now on
+    for hour in range(t + 2, t + 5):
+        heat, cool = controller.decide(model, hour)
+    # the plan is used up, the heat pump keeps the room at the lower limit
+    a, b, gain = controller.rc(model, np.array([t + 4]))
+    TI = a[0] * model.TI[t + 3] + b[0] + gain * (heat - cool)
+    assert TI == pytest.approx(max(controller.control.heat_on[t + 4], a[0] * model.TI[t + 3] + b[0]))
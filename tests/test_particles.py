@@ -0,0 +1,46 @@
+import numpy as np
+
+from particles import ParticleGroup
+
+
+def emit_rows(group, lifetimes):
+    """one particle per lifetime, its x position tells which one it is"""
+    for i, lifetime in enumerate(lifetimes):
+        group.emit((i, 0), (0, 0), lifetime)
+
+
+def test_compact_keeps_exactly_the_live_particles():
+    group = ParticleGroup(capacity=16, spread=0, rng=np.random.default_rng(0))
+    lifetimes = [3, 0, 5, 0, 0, 2, 0, 7]
+    emit_rows(group, lifetimes)
+    group.compact()
+    live = [i for i, lifetime in enumerate(lifetimes) if lifetime > 0]
+    assert group.count == len(live)
+    assert sorted(group.pos[: group.count, 0].tolist()) == live
+    # every particle kept its own lifetime
+    for x, lifetime in zip(group.pos[: group.count, 0].astype(int), group.lifetime[: group.count]):
+        assert lifetime == lifetimes[x]
+
+
+def test_compact_without_dead_particles_changes_nothing():
+    group = ParticleGroup(capacity=8, spread=0)
+    emit_rows(group, [1, 2, 3])
+    pos = group.pos.copy()
+    group.compact()
+    assert group.count == 3
+    assert np.array_equal(group.pos, pos)
+
+
+def test_update_removes_particles_at_the_end_of_their_life():
+    group = ParticleGroup(capacity=8, spread=0)
+    emit_rows(group, [1, 2, 2])
+    group.update()
+    assert group.count == 2
+    group.update()
+    assert group.count == 0
+
+
+def test_emit_stops_at_capacity():
+    group = ParticleGroup(capacity=4)
+    group.emit((0, 0), (1, 0), 10, n=10)
+    assert len(group) == 4
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from model.results import COLUMNS, ResultStore
+
+
+def test_reset_restores_initial_values_in_place():
+    store = ResultStore()
+    data = store.data
+    store.data[...] = 5.0
+    store.reset()
+    assert store.data is data
+    assert (store["TI"] == 20.0).all()
+    assert not store["QH"].any()
+
+
+def test_columns_are_views_of_the_block():
+    store = ResultStore(dtype=np.float32)
+    assert store.dtype == np.float32
+    assert np.shares_memory(store.TI, store.data)
+    store.QH[3] = 1.5
+    assert store.data[COLUMNS.index("QH"), 3] == 1.5
+    assert store.TI is not store.QH and "TI" in store
+    with pytest.raises(AttributeError):
+        store.nonexistent
+
+
+def test_copy_survives_reset():
+    store = ResultStore()
+    store.QH[:] = 1.0
+    copy = store.copy(dtype=np.float32)
+    store.reset()
+    assert copy.dtype == np.float32
+    assert (copy.QH == 1.0).all()
+
+
+def test_npz_round_trip(tmp_path):
+    store = ResultStore(hours=24)
+    store.data[...] = np.random.default_rng(0).normal(size=store.data.shape)
+    path = tmp_path / "results.npz"
+    store.save(path)
+    loaded = ResultStore.load(path)
+    assert loaded.columns == store.columns
+    assert np.array_equal(loaded.data, store.data)
+    assert ResultStore.load(path, dtype=np.float32).dtype == np.float32
+
+
+def test_wrong_shape_is_rejected():
+    with pytest.raises(ValueError):
+        ResultStore(hours=24, data=np.zeros((2, 24)))
+
+
+def test_model_arrays_stay_views_across_init_sim():
+    from model.Simulation import EnergyModel
+
+    model = EnergyModel(seed=0)
+    TI = model.TI
+    model.init_sim()
+    model.simulate()
+    model.init_sim()
+    assert model.TI is TI
+    assert np.shares_memory(model.TI, model.results.data)
+    assert not model.QH.any()
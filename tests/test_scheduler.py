@@ -0,0 +1,53 @@
+import time
+from dataclasses import replace
+
+import pytest
+
+from model.GameModel import GameModel
+from scheduler import SimulationScheduler, Snapshot
+
+
+@pytest.fixture
+def game():
+    game = GameModel()
+    game.setup_sim(start_hour=100)
+    return game
+
+
+def test_alpha_interpolates_between_the_published_snapshots(game):
+    scheduler = SimulationScheduler(game)
+    previous = Snapshot.of(game)
+    current = replace(previous, hour=previous.hour + 1, time=previous.time + 0.1)
+    scheduler._published = (previous, current)
+    assert scheduler.alpha(now=current.time) == 0.0
+    assert scheduler.alpha(now=current.time + 0.05) == pytest.approx(0.5)
+    assert scheduler.alpha(now=current.time + 1) == 1.0
+
+
+def test_worker_advances_the_game_with_the_committed_input(game):
+    game.set_speed(240)
+    scheduler = SimulationScheduler(game)
+    scheduler.start()
+    try:
+        scheduler.heat()
+        scheduler.commit_input()
+        time.sleep(0.3)
+    finally:
+        scheduler.stop()
+    assert scheduler.thread is None
+    snapshot = scheduler.snapshot
+    assert snapshot.hour > 100
+    assert snapshot.hour == game.hour
+    assert game.model.QH[101 : game._mh + 1].all()  # heated every hour
+
+
+def test_worker_stops_at_the_end_of_the_year():
+    game = GameModel()
+    game.setup_sim(start_hour=8740)
+    game.set_speed(672)
+    scheduler = SimulationScheduler(game)
+    scheduler.start()
+    time.sleep(0.3)
+    scheduler.stop()
+    assert scheduler.year_finished
+    assert game.hour == game.final_hour_of_the_year - 1
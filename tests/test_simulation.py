@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from model.Simulation import EnergyModel
+
+
+@pytest.fixture(scope="module")
+def full():
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    model.simulate()
+    model.calc_cost(verbose=False)
+    return model
+
+
+def simulated_columns(model):
+    columns = model.results.columns
+    return columns[: columns.index("Btt_to_ED") + 1]
+
+
+def test_summary_keeping_all_columns_is_identical(full):
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    model.simulate(outputs=simulated_columns(model))
+    for name in simulated_columns(model):
+        assert np.array_equal(model.results[name], full.results[name]), name
+
+
+def test_summary_only_matches_annual_sums(full):
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    model.simulate(outputs=("TI", "ED_grid"))
+    model.calc_cost(verbose=False)
+    np.testing.assert_allclose(model.TI, full.TI, rtol=0, atol=1e-9)
+    for name in simulated_columns(model):
+        assert model.annual_sum(name) == pytest.approx(full.annual_sum(name), rel=1e-9), name
+    assert model.operational_cost == pytest.approx(full.operational_cost, rel=1e-9)
+    assert not model.QV.any()  # not kept
+
+
+def test_unknown_outputs_are_rejected():
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    with pytest.raises(ValueError):
+        model.simulate(outputs=("TI", "nonexistent"))
+
+
+def test_cancelled_simulation_stops():
+    from concurrent.futures import CancelledError
+
+    model = EnergyModel(seed=0)
+    model.init_sim()
+    with pytest.raises(CancelledError):
+        model.simulate(outputs=("TI",), cancelled=lambda hour: True)
+
+
+def test_simulate_combination_reports_progress():
+    from pathlib import Path
+
+    from jobs import Job
+    from model.Simulation import DATA_PATH, DEFAULT_PATH_BUILDING
+    from model.upgrades import model_state, simulate_combination
+
+    path = Path(DATA_PATH, DEFAULT_PATH_BUILDING)
+    state = model_state(EnergyModel(path, seed=0))
+    seen = []
+
+    class RecordingJob(Job):
+        @property
+        def cancelled(self):
+            seen.append(self.progress)
+            return False
+
+    simulate_combination(RecordingJob("combination"), path, 0, state, ())
+    assert seen == sorted(seen) and 0 < seen[0] < seen[-1] < 1
@@ -2,6 +2,8 @@
 import pygame as pg
 import math
 
+import numpy as np
+
 def color_interpolation(color1, color2, weight):
     colorvector1 = pg.Vector3(color1)
     colorvector2 = pg.Vector3(color2)
@@ -11,6 +13,22 @@ def color_interpolation(color1, color2, weight):
 def seasonalcolor(timeofyear=0, winter_color=(60, 84, 153), summer_color=(255, 232, 197)):
     return color_interpolation(winter_color, summer_color, weight=(1-math.cos(2*math.pi*timeofyear/8760)))
 
+def color_interpolations(color1, color2, weights):
+    """color_interpolation for arrays of colors and/or weights, returns (..., 3) floats"""
+    weights = np.asarray(weights, dtype=float)
+    color1, color2 = np.broadcast_arrays(np.asarray(color1, float), np.asarray(color2, float))
+    delta = color2 - color1
+    dist = np.sqrt((delta**2).sum(axis=-1))
+    # same steps as Vector3.move_towards, which stops at the target color
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(weights >= 1, 1.0, weights * dist / dist)
+    return color1 + np.nan_to_num(frac)[..., None] * delta
+
+def seasonalcolors(hours=8760, winter_color=(60, 84, 153), summer_color=(255, 232, 197)):
+    """seasonalcolor of every hour of the year as an (hours, 3) float array"""
+    weights = 1 - np.cos(2 * np.pi * np.arange(hours) / 8760)
+    return color_interpolations(winter_color, summer_color, weights)
+
 def circle_surf(radius, color):
     surf = pg.Surface((radius*2,radius*2))
     pg.draw.circle(surf, color, (radius, radius), radius)